@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(__file__), "recordings.json")
+
+
+def load_recordings(path=RECORDINGS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class LatencyModel:
+    """Delay = base + per_item * items + uniform(0, jitter), all in seconds. Seeded, so runs are repeatable."""
+
+    def __init__(self, base=0.0, jitter=0.0, per_item=0.0, seed=None):
+        self.base = base
+        self.jitter = jitter
+        self.per_item = per_item
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, items=1):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.base + self.per_item * items + extra
+
+    def sleep(self, items=1):
+        seconds = self.delay(items)
+        if seconds > 0: time.sleep(seconds)
+
+
+class FakeHTTPServer:
+    """
+    Base for the local HTTP stand-ins: a ThreadingHTTPServer on a free port, usable as a
+    context manager. Subclasses implement handle(handler, method, path, body).
+    Every request is appended to 'calls' as (method, path).
+    """
+
+    def __init__(self, latency=None, host="127.0.0.1", port=0):
+        self.latency = latency or LatencyModel()
+        self.calls = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+
+            def do_GET(self): server._dispatch(self, "GET")
+            def do_POST(self): server._dispatch(self, "POST")
+            def log_message(self, *args): pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _dispatch(self, handler, method):
+        path = handler.path
+        self.calls.append((method, path))
+        body = self._read_body(handler)
+        try:
+            self.handle(handler, method, path, body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client hung up (e.g. TTS barge-in)
+
+    @staticmethod
+    def _read_body(handler):
+        if handler.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(handler.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    handler.rfile.readline()
+                    return bytes(body)
+                body.extend(handler.rfile.read(size))
+                handler.rfile.readline()
+        length = int(handler.headers.get("Content-Length") or 0)
+        return handler.rfile.read(length) if length else b""
+
+    @staticmethod
+    def send_json(handler, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def handle(self, handler, method, path, body):
+        raise NotImplementedError
+
+
+class FakeMurfServer(FakeHTTPServer):
+    """
+    Murf /v1/speech/stream stand-in: chunked 16-bit PCM (a quiet tone).
+    'latency' is the time to first byte; the clip is about 'ms_per_char' long per character
+    and is streamed 'speed' times faster than real time. Point VoiceEngine at it with MURF_API_URL.
+    """
+
+    def __init__(self, latency=None, ms_per_char=60, speed=4.0, chunk_ms=50, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.ms_per_char = ms_per_char
+        self.speed = speed
+        self.chunk_ms = chunk_ms
+        self.bytes_streamed = 0
+
+    def handle(self, handler, method, path, body):
+        request = json.loads(body or b"{}")
+        rate = int(request.get("sampleRate", 24000))
+        seconds = max(0.2, len(request.get("text", "")) * self.ms_per_char / 1000)
+        self.latency.sleep()
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "audio/pcm")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        chunk_samples = int(rate * self.chunk_ms / 1000)
+        total = int(rate * seconds)
+        tone = self._tone(rate, chunk_samples)
+        for start in range(0, total, chunk_samples):
+            count = min(chunk_samples, total - start)
+            pcm = tone[:count * 2]
+            handler.wfile.write(f"{len(pcm):X}\r\n".encode() + pcm + b"\r\n")
+            handler.wfile.flush()
+            self.bytes_streamed += len(pcm)
+            time.sleep(count / rate / self.speed)
+        handler.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _tone(rate, count):
+        # 200 Hz divides every chunk length we use, so chunks can be reused back to back
+        return b"".join(int(1000 * math.sin(2 * math.pi * 200 * i / rate)).to_bytes(2, "little", signed=True)
+                        for i in range(count))
+
+
+class FakeGeminiServer(FakeHTTPServer):
+    """
+    Gemini generateContent stand-in that replays recorded responses (benchmarks/recordings.json).
+    The prompt decides the reply: single/batch email analysis, intent routing, translation or a
+    draft reply. Batch requests cost 'latency.per_item' extra per email, like output tokens do.
+    Point the SDK at it with GOOGLE_GEMINI_BASE_URL (read when the client is created).
+    """
+
+    def __init__(self, latency=None, recordings=None, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.recordings = recordings or load_recordings()
+        self.requests_by_kind = {}
+
+    def handle(self, handler, method, path, body):
+        if not path.split("?")[0].endswith(":generateContent"):
+            return self.send_json(handler, {"error": {"code": 404, "message": f"Unknown path {path}"}}, 404)
+        request = json.loads(body or b"{}")
+        prompt = " ".join(part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", []))
+
+        kind, text, items = self._reply(prompt)
+        self.requests_by_kind[kind] = self.requests_by_kind.get(kind, 0) + 1
+        self.latency.sleep(items)
+        self.send_json(handler, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+        })
+
+    def _reply(self, prompt):
+        if "EMAIL ID:" in prompt:
+            blocks = re.findall(r"--- EMAIL ID: (E\d+) ---\s*\"(.*?)\"\s*(?=--- EMAIL ID:|$)", prompt, re.S)
+            results = [dict(self._analysis(text), email_id=email_id) for email_id, text in blocks]
+            return "analysis_batch", json.dumps({"results": results}), len(results)
+        if "EMAIL CONTENT:" in prompt:
+            return "analysis", json.dumps(self._analysis(prompt.split("EMAIL CONTENT:", 1)[1])), 1
+        if "User Command:" in prompt:
+            command = prompt.split("User Command:", 1)[1].strip().strip('"').lower()
+            intent = next((i for phrase, i in self.recordings["intents"].items() if phrase in command), self.recordings["intents"]["unknown"])
+            return "intent", json.dumps(intent), 1
+        if "TEXTS TO TRANSLATE:" in prompt:
+            pairs = re.findall(r"\[(T\d+)\] \"(.*?)\"", prompt, re.S)
+            translations = [{"text_id": text_id, "translation": self._hinglish(text)} for text_id, text in pairs]
+            return "translation_batch", json.dumps({"translations": translations}), len(translations)
+        if "TEXT TO TRANSLATE:" in prompt:
+            return "translation", self._hinglish(prompt.split("TEXT TO TRANSLATE:", 1)[1].strip().strip('"')), 1
+        return "reply", self.recordings["reply"], 1
+
+    def _analysis(self, email_text):
+        # Same email -> same recorded analysis, so repeated runs are comparable
+        analyses = self.recordings["analyses"]
+        digest = int(hashlib.sha256(email_text.strip().encode("utf-8")).hexdigest(), 16)
+        return analyses[digest % len(analyses)]
+
+    def _hinglish(self, text):
+        return f"{self.recordings['hinglish_prefix']} {text.strip()}"
+
+
+class FakeAssemblyAIServer(FakeHTTPServer):
+    """
+    AssemblyAI REST stand-in (/v2/upload, /v2/transcript). A transcript reports 'processing'
+    until 'latency' has passed since it was created, then 'completed' with the next text from
+    'transcripts'. Point the SDK at it with assemblyai.settings.base_url.
+    """
+
+    def __init__(self, latency=None, transcripts=("Start analysis.",), **kwargs):
+        super().__init__(latency, **kwargs)
+        self.transcripts = list(transcripts)
+        self.queued = deque()
+        self.uploaded_bytes = 0
+        self._jobs = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def queue_transcript(self, text):
+        """Makes 'text' the answer for the next transcription request (before the rotating defaults)."""
+        with self._lock:
+            self.queued.append(text)
+
+    def handle(self, handler, method, path, body):
+        path = path.split("?")[0]
+        if method == "POST" and path == "/v2/upload":
+            self.uploaded_bytes += len(body)
+            return self.send_json(handler, {"upload_url": f"{self.url}/files/{uuid.uuid4().hex}"})
+
+        if method == "POST" and path == "/v2/transcript":
+            request = json.loads(body or b"{}")
+            with self._lock:
+                if self.queued:
+                    text = self.queued.popleft()
+                else:
+                    text = self.transcripts[self._next % len(self.transcripts)]
+                    self._next += 1
+                job = {"id": uuid.uuid4().hex, "audio_url": request.get("audio_url", ""), "text": text,
+                       "ready_at": time.monotonic() + self.latency.delay()}
+                self._jobs[job["id"]] = job
+            return self.send_json(handler, self._status(job))
+
+        if method == "GET" and path.startswith("/v2/transcript/"):
+            job = self._jobs.get(path.rsplit("/", 1)[1])
+            if not job: return self.send_json(handler, {"error": "Transcript not found"}, 404)
+            return self.send_json(handler, self._status(job))
+
+        self.send_json(handler, {"error": f"Unknown path {path}"}, 404)
+
+    @staticmethod
+    def _status(job):
+        done = time.monotonic() >= job["ready_at"]
+        return {"id": job["id"], "audio_url": job["audio_url"], "status": "completed" if done else "processing",
+                "text": job["text"] if done else None}
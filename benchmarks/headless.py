@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+
+class HeadlessPage:
+    """
+    Just enough of ft.Page to run ModernLightApp without a window.
+    The app's turn tasks run on a private event loop thread, exactly as they would on Flet's loop;
+    run() submits a coroutine to it and blocks until it finishes.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="headless-page", daemon=True)
+        self._thread.start()
+        self.updates = 0
+        self.window = SimpleNamespace(destroy=lambda: None)
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def get_control(self, uid):
+        return None  # Nothing is ever rendered
+
+    def add(self, *controls):
+        pass
+
+    def run_task(self, handler, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(handler(*args, **kwargs), self.loop)
+
+    def run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
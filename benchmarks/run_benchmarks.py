@@ -0,0 +1,257 @@
+"""
+Offline end-to-end benchmarks for the voice agent.
+
+Starts local stand-ins for Murf (chunked PCM stream), AssemblyAI (upload + transcript polling),
+Gemini (generateContent, replaying benchmarks/recordings.json) and Gmail/Sheets
+(services.fake_google.FakeGoogleHttp), each with configurable latency and jitter, then drives the
+real gui_app workflows headlessly:
+  - analysis: run_analysis_workflow over a cold and a warm inbox scan; the scan (Gmail fetch +
+              Gemini analysis) and the spoken readout that follows it are timed separately
+  - voice:    full voice turns (captured audio -> transcription -> intent -> action -> speech)
+
+Usage:
+    python -m benchmarks.run_benchmarks --emails 24 --runs 3
+    python -m benchmarks.run_benchmarks --json results.json
+    python -m benchmarks.run_benchmarks --baseline results.json --tolerance 0.25   # exit 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+from benchmarks.fake_servers import LatencyModel, FakeMurfServer, FakeGeminiServer, FakeAssemblyAIServer
+
+VOICE_COMMANDS = ["Start analysis.", "Explain email two.", "How are things looking with my customers today?"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmarks with local service stand-ins.")
+    parser.add_argument("--scenarios", default="analysis,voice", help="Comma separated: analysis, voice")
+    parser.add_argument("--emails", type=int, default=24, help="Inbox size scanned by the analysis workflow")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per scenario")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--jitter", type=float, default=0.1, help="Max random extra delay per request (s), all services")
+    parser.add_argument("--gemini-latency", type=float, default=0.8)
+    parser.add_argument("--gemini-per-email", type=float, default=0.05, help="Extra Gemini time per email in a batch (s)")
+    parser.add_argument("--murf-latency", type=float, default=0.25, help="Murf time to first byte (s)")
+    parser.add_argument("--murf-speed", type=float, default=4.0, help="Murf streaming speed vs real time")
+    parser.add_argument("--stt-latency", type=float, default=0.5, help="AssemblyAI processing time (s)")
+    parser.add_argument("--google-latency", type=float, default=0.05, help="Gmail/Sheets round-trip (s)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare against an earlier --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def percentiles(values):
+    if not values: return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {"p50": statistics.median(ordered), "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+            "max": ordered[-1]}
+
+
+def make_inbox(count):
+    """Synthetic inbox built from the fake_google sample messages."""
+    from services.fake_google import SAMPLE_MESSAGES
+    inbox = []
+    for i in range(count):
+        base = SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]
+        inbox.append(dict(base, id=f"bench{i:04x}", snippet=f"{base['snippet']} (ticket {i})"))
+    return inbox
+
+
+def speech_like_audio(rate, seconds=1.0, pad=0.3, seed=0):
+    """Silence, a noise burst at conversational level, silence (int16 samples)."""
+    rng = np.random.default_rng(seed)
+    voiced = rng.normal(0, 3000, int(rate * seconds)) * np.hanning(int(rate * seconds))
+    silence = np.zeros(int(rate * pad))
+    return np.concatenate([silence, voiced, silence]).astype(np.int16)
+
+
+class Bench:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        latency = lambda base, per_item=0.0, offset=0: LatencyModel(base, args.jitter, per_item, seed=args.seed + offset)
+        self.gemini = FakeGeminiServer(latency(args.gemini_latency, args.gemini_per_email, 1)).start()
+        self.murf = FakeMurfServer(latency(args.murf_latency, offset=2), speed=args.murf_speed).start()
+        self.stt = FakeAssemblyAIServer(latency(args.stt_latency, offset=3)).start()
+        self.inbox = make_inbox(args.emails)
+        self.sync_state_path = os.path.join(workdir, "sync_state.json")
+
+        # Everything below reads its configuration at import/construction time
+        os.environ.update({
+            "GEMINI_API_KEY": "bench", "GOOGLE_GEMINI_BASE_URL": self.gemini.url,
+            "MURF_API_KEY": "bench", "MURF_API_URL": f"{self.murf.url}/v1/speech/stream",
+            "ASSEMBLYAI_API_KEY": "bench", "STT_MODE": "batch", "TTS_WARMUP": "0",
+            "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"), "SPREADSHEET_ID": "bench-sheet",
+            "SESSION_LOG_DIR": os.path.join(workdir, "session_logs"),
+        })
+        import assemblyai as aai
+        aai.settings.base_url = self.stt.url
+
+        from gui_app import ModernLightApp
+        from services.audio_player import AudioPlayer
+        from services.murf_tts import VoiceEngine
+        from services.transcriber import Transcriber
+        from benchmarks.headless import HeadlessPage
+
+        self.page = HeadlessPage()
+        self.voice = VoiceEngine(player=AudioPlayer(simulate=True))
+        self.ears = Transcriber(streaming=False)
+        self.app = ModernLightApp(self.page, voice=self.voice, ears=self.ears, email_factory=self.email_manager)
+        self.app.scan_count = args.emails
+        self.google = None
+        self.card_times = []
+        self.scan_done_at = None
+        show_card = self.app.add_dashboard_card
+        self.app.add_dashboard_card = lambda *a: (self.card_times.append(time.perf_counter()), show_card(*a))[1]
+        # The final progress update marks the end of the scan; everything after it is the readout
+        show_progress = self.app.show_scan_progress
+        def track_progress(*a, done=False):
+            if done: self.scan_done_at = time.perf_counter()
+            return show_progress(*a, done=done)
+        self.app.show_scan_progress = track_progress
+        self.page.run(self.wait_idle())
+
+    def email_manager(self):
+        from services.email_manager import EmailManager
+        return EmailManager(http=self.google, sync_state_path=self.sync_state_path)
+
+    async def wait_idle(self):
+        await self.app.wait_for_speech()
+
+    def fresh_mailbox(self, cold=True):
+        from services.fake_google import FakeGoogleHttp
+        from services.analysis_engine import AnalysisEngine
+        from services.analysis_cache import AnalysisCache
+        self.google = FakeGoogleHttp(messages=self.inbox, latency=self.args.google_latency, jitter=self.args.jitter)
+        if cold:
+            if os.path.exists(self.sync_state_path): os.remove(self.sync_state_path)
+            self.app.engine = AnalysisEngine(cache=AnalysisCache(path=os.path.join(self.workdir, f"cache{time.time_ns()}.db")))
+
+    # --- Scenarios ---
+    def run_analysis(self):
+        results = {"cold_s": [], "warm_s": [], "first_card_s": [], "readout_s": [], "gemini_requests": []}
+        for _ in range(self.args.runs):
+            for cold in (True, False):
+                self.fresh_mailbox(cold=cold)
+                requests_before = sum(self.gemini.requests_by_kind.values())
+                self.card_times.clear()
+                self.scan_done_at = None
+                start = time.perf_counter()
+                self.page.run(self.app.run_analysis_workflow(language="en"))
+                finished = time.perf_counter()
+                # Readout plays in (simulated) real time, so it is kept out of the scan numbers
+                scan_done = self.scan_done_at or finished
+                results["cold_s" if cold else "warm_s"].append(scan_done - start)
+                results["readout_s"].append(finished - scan_done)
+                if cold:
+                    if self.card_times: results["first_card_s"].append(self.card_times[0] - start)
+                    results["gemini_requests"].append(sum(self.gemini.requests_by_kind.values()) - requests_before)
+        cold = percentiles(results["cold_s"])
+        return {
+            "emails": self.args.emails,
+            "cold_s": cold, "warm_s": percentiles(results["warm_s"]), "first_card_s": percentiles(results["first_card_s"]),
+            "readout_s": percentiles(results["readout_s"]),
+            "emails_per_second": self.args.emails / cold["p50"] if cold["p50"] else 0.0,
+            "gemini_requests_per_scan": statistics.median(results["gemini_requests"]) if results["gemini_requests"] else 0,
+        }
+
+    def run_voice(self):
+        from services.tracing import tracer
+        self.fresh_mailbox(cold=True)
+        turns = {command: [] for command in VOICE_COMMANDS}
+        for run in range(self.args.runs):
+            for command in VOICE_COMMANDS:
+                self.stt.queue_transcript(command)
+                self.ears.buffer.clear()
+                self.ears.buffer.write(speech_like_audio(self.ears.RATE, seed=run))
+                tracer.start_turn()
+                start = time.perf_counter()
+                self.page.run(self.app.run_voice_turn())
+                turns[command].append(time.perf_counter() - start)
+        all_turns = [t for values in turns.values() for t in values]
+        return {"turn_s": percentiles(all_turns), "by_command_s": {c: percentiles(v) for c, v in turns.items()}}
+
+    def close(self):
+        self.voice.close()
+        self.page.close()
+        for server in (self.gemini, self.murf, self.stt): server.stop()
+
+
+# --- Reporting ---
+def print_report(results):
+    if "analysis" in results:
+        a = results["analysis"]
+        print(f"\n=== Analysis workflow ({a['emails']} emails) ===")
+        print(f"cold scan      p50 {a['cold_s']['p50']:.2f}s  p95 {a['cold_s']['p95']:.2f}s  ({a['emails_per_second']:.1f} emails/s, {a['gemini_requests_per_scan']} Gemini requests)")
+        print(f"warm rescan    p50 {a['warm_s']['p50']:.2f}s  p95 {a['warm_s']['p95']:.2f}s")
+        print(f"first card     p50 {a['first_card_s']['p50']:.2f}s")
+        print(f"readout        p50 {a['readout_s']['p50']:.2f}s  p95 {a['readout_s']['p95']:.2f}s  (spoken results after the scan)")
+    if "voice" in results:
+        v = results["voice"]
+        print(f"\n=== Voice turns ===")
+        print(f"all turns      p50 {v['turn_s']['p50']:.2f}s  p95 {v['turn_s']['p95']:.2f}s")
+        for command, s in v["by_command_s"].items():
+            print(f"  {command:<50} p50 {s['p50']:.2f}s")
+    print("\n=== Stages (services.tracing) ===")
+    print(f"{'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in results["stages"].items():
+        print(f"{stage:<14}{s['count']:>7}{s['p50']:>10.0f}{s['p95']:>10.0f}{s['p99']:>10.0f}")
+
+
+# Headline numbers checked against --baseline (lower is better)
+HEADLINE_METRICS = [("analysis", "cold_s"), ("analysis", "warm_s"), ("analysis", "first_card_s"), ("analysis", "readout_s"), ("voice", "turn_s")]
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regressions (empty when everything is within tolerance)."""
+    regressions = []
+    for scenario, metric in HEADLINE_METRICS:
+        old = baseline.get(scenario, {}).get(metric, {}).get("p50")
+        new = results.get(scenario, {}).get(metric, {}).get("p50")
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{scenario}.{metric} p50 {old:.2f}s -> {new:.2f}s (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    repo_dir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="murf-bench-")
+    os.chdir(workdir)  # Anything else written to the cwd (e.g. traces) stays out of the repo
+
+    bench = Bench(args, workdir)
+    results = {"config": vars(args)}
+    try:
+        if "analysis" in scenarios: results["analysis"] = bench.run_analysis()
+        if "voice" in scenarios: results["voice"] = bench.run_voice()
+    finally:
+        bench.close()
+        os.chdir(repo_dir)
+
+    from services.tracing import tracer
+    results["stages"] = tracer.stats()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions: print(f"❌ Regression: {line}")
+        if regressions: return 1
+        print("✅ Within tolerance of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
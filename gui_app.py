@@ -1,32 +1,83 @@
+from services.startup_profile import profiler  # First, so STARTUP_PROFILE=1 also times the imports below
 import flet as ft
-import threading
+import os
 import time
-import re
-from services.email_manager import EmailManager
-from services.llm_brain import analyze_email, generate_email_reply, translate_to_hindi
+import asyncio
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from services.email_manager import EmailManager, google_clients, SCAN_QUERY, SCAN_LABELS, SCAN_AFTER, SCAN_BEFORE, SCAN_LIMIT
+from services.gemini_client import gemini
+from services.llm_brain import generate_email_reply
+from services.translation_cache import TranslationCache
+from services.draft_speculator import DraftSpeculator, AUTO_DRAFT
+from services.analysis_engine import AnalysisEngine
+from services.analysis_cache import AnalysisCache
+from services.sheet_writer import SheetWriter
 from services.murf_tts import VoiceEngine
 from services.transcriber import Transcriber
-from services.intent_router import determine_intent
+from services.intent_router import determine_intent, parse_number_word
+from services.tracing import tracer, TRACE_EXPORT_PATH
+from services.log_store import LogStore
+
+UI_FRAME_SECONDS = 0.05  # Coalesced page updates: at most one redraw per frame
+MAX_READOUT = 10  # Negative emails read aloud after a scan; the rest stay on the dashboard
+LOG_VIEW_MAX_LINES = 1000  # Lines the Logs tab holds at once; older ones are paged in from disk on scroll
+LOG_PAGE_SIZE = 100
+
+# Cards and log lines never change once shown. Flet's update diff skips "isolated" subtrees,
+# so a redraw costs one hash per card instead of a walk through every nested control.
+class StaticContainer(ft.Container):
+    def is_isolated(self): return True
+
+class StaticText(ft.Text):
+    def is_isolated(self): return True
 
 class ModernLightApp:
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, voice=None, ears=None, email_factory=EmailManager):
         self.page = page
         self.setup_page()
         
         # --- Backend Services ---
-        self.voice = VoiceEngine()
-        self.ears = Transcriber()
+        # (overridable so benchmarks/ can run the app headless against local stand-ins)
+        with profiler.measure("VoiceEngine()"): self.voice = voice or VoiceEngine()
+        with profiler.measure("Transcriber()"): self.ears = ears or Transcriber()
+        self.email_factory = email_factory
+        self.scan_count = 6  # Newest emails looked at per scan
+        self.ears.on_partial = self.show_live_caption
+        self.ears.on_auto_stop = self.on_auto_stop
+        with profiler.measure("AnalysisCache()"): self.engine = AnalysisEngine(cache=AnalysisCache())
+        self.translations = TranslationCache()
+        self.drafts = DraftSpeculator(on_ready=self.auto_draft if AUTO_DRAFT else None)
+        self.email_bot = None  # Last scan's EmailManager (the Google services behind it are process-wide)
+        self.drafted_ids = set()
+        self.drafting = {}  # message_id -> Event set when its Gmail draft attempt ends (auto and explicit drafts race)
+        self.draft_lock = threading.Lock()
+        self.draft_refs = {}
         self.is_recording = False
+        self.mic_ready = None  # Future of the mic being opened on the worker pool
+
+        # --- TURN SCHEDULER ---
+        self.turn = None  # Future of the running turn task
+        self.blocking_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="turn-io")
+        self._update_scheduled = False
+        self._update_cost = 0.0  # Seconds the last coalesced page.update() took
+        self._dirty = set()  # Controls changed since the last redraw (None = whole page)
         
         # --- MEMORY ---
-        self.log_history = [] 
+        self.logs = LogStore()  # Newest entries in memory, the whole session on disk
+        self.log_view_at_tail = True  # False while the Logs tab is scrolled back into older pages
         self.cached_analyses = [] 
 
         # --- DYNAMIC UI COMPONENTS ---
-        self.col_positive = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
-        self.col_neutral = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
-        self.col_negative = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
+        # ListViews only lay out the cards in view; 'data' holds each column's sorted card IDs
+        self.col_positive = ft.ListView(spacing=10, expand=True, data=[])
+        self.col_neutral = ft.ListView(spacing=10, expand=True, data=[])
+        self.col_negative = ft.ListView(spacing=10, expand=True, data=[])
         self.middle_content_area = ft.Container(expand=True)
+        self.scan_progress_text = ft.Text("", size=12, color=ft.Colors.GREY_500)
+        self.scan_progress_bar = ft.ProgressBar(value=None, color=ft.Colors.INDIGO_400, bgcolor=ft.Colors.GREY_200, visible=False)
 
         # --- Build Views ---
         self.dashboard_view = self.build_dashboard()
@@ -53,6 +104,7 @@ class ModernLightApp:
         self.page.add(ft.Row([ft.Container(self.sidebar, shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.GREY_200)), self.content_area], expand=True, spacing=0))
         
         self.show_empty_state()
+        profiler.mark("first paint")
         self.page.run_task(self.initial_greeting)
 
     def setup_page(self):
@@ -79,6 +131,7 @@ class ModernLightApp:
             animate_scale=ft.Animation(100, ft.AnimationCurve.EASE_OUT), animate=ft.Animation(300, ft.AnimationCurve.EASE_OUT),
             shadow=ft.BoxShadow(blur_radius=20, color=ft.Colors.BLUE_200, spread_radius=5)
         )
+        self.caption_text = ft.Text("Tap to Speak", size=13, weight="bold", color=ft.Colors.GREY_400)
         self.visualizer = ft.Container(width=90, height=90, border_radius=45, bgcolor=ft.Colors.BLUE_100, opacity=0, animate_opacity=300, animate_scale=500)
 
         return ft.Column([
@@ -90,7 +143,7 @@ class ModernLightApp:
             ft.Container(height=20),
             self.middle_content_area,
             ft.Container(height=20),
-            ft.Container(height=160, content=ft.Column([ft.Stack([ft.Container(self.visualizer, alignment=ft.alignment.center), ft.Container(self.mic_btn, alignment=ft.alignment.center)], alignment=ft.alignment.center), ft.Container(height=15), ft.Text("Tap to Speak", size=13, weight="bold", color=ft.Colors.GREY_400)], horizontal_alignment=ft.CrossAxisAlignment.CENTER))
+            ft.Container(height=160, content=ft.Column([ft.Stack([ft.Container(self.visualizer, alignment=ft.alignment.center), ft.Container(self.mic_btn, alignment=ft.alignment.center)], alignment=ft.alignment.center), ft.Container(height=15), self.caption_text], horizontal_alignment=ft.CrossAxisAlignment.CENTER))
         ])
 
     def show_empty_state(self):
@@ -118,19 +171,23 @@ class ModernLightApp:
             shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.GREY_200)
         )
         self.middle_content_area.content = content
-        self.page.update()
+        self.request_update()
 
     def show_results_state(self):
         content = ft.Container(
-            content=ft.Row([
-                self.build_column_container("Positive", ft.Colors.GREEN_500, self.col_positive),
-                self.build_column_container("Neutral", ft.Colors.BLUE_GREY_400, self.col_neutral),
-                self.build_column_container("Negative", ft.Colors.RED_500, self.col_negative),
-            ], alignment=ft.MainAxisAlignment.START, vertical_alignment=ft.CrossAxisAlignment.START, expand=True),
+            content=ft.Column([
+                self.scan_progress_text,
+                self.scan_progress_bar,
+                ft.Row([
+                    self.build_column_container("Positive", ft.Colors.GREEN_500, self.col_positive),
+                    self.build_column_container("Neutral", ft.Colors.BLUE_GREY_400, self.col_neutral),
+                    self.build_column_container("Negative", ft.Colors.RED_500, self.col_negative),
+                ], alignment=ft.MainAxisAlignment.START, vertical_alignment=ft.CrossAxisAlignment.START, expand=True),
+            ], spacing=8, expand=True),
             expand=True
         )
         self.middle_content_area.content = content
-        self.page.update()
+        self.request_update()
 
     def build_column_container(self, title, color, col_control):
         return ft.Container(
@@ -142,8 +199,21 @@ class ModernLightApp:
         )
 
     def build_logs_page(self):
-        self.full_log_list = ft.ListView(expand=True, spacing=10)
-        return ft.Column([ft.Text("System Logs", size=28, weight="bold", color=ft.Colors.BLUE_GREY_900), ft.Container(height=10), ft.Container(content=self.full_log_list, expand=True, bgcolor=ft.Colors.WHITE, border_radius=20, padding=20, shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.GREY_200))])
+        # Each line's 'data' is its log sequence number; scrolling to the top pages in older entries
+        self.full_log_list = ft.ListView(expand=True, spacing=10, on_scroll=self.on_log_scroll, on_scroll_interval=100)
+        # Per-stage turn latency (services.tracing), refreshed whenever the tab is shown
+        self.latency_table = ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(name, weight="bold", size=12), numeric=name != "Stage") for name in ["Stage", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms"]],
+            rows=[], heading_row_height=32, data_row_min_height=28, data_row_max_height=28, column_spacing=30
+        )
+        export_btn = ft.TextButton("Export traces", icon=ft.Icons.DOWNLOAD, on_click=self.export_traces)
+        return ft.Column([
+            ft.Row([ft.Text("System Logs", size=28, weight="bold", color=ft.Colors.BLUE_GREY_900), ft.Container(expand=True), export_btn]),
+            ft.Container(height=10),
+            ft.Container(content=ft.Column([ft.Text("Turn Latency", weight="bold", size=16), self.latency_table], scroll=ft.ScrollMode.AUTO), height=260, bgcolor=ft.Colors.WHITE, border_radius=20, padding=20, shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.GREY_200)),
+            ft.Container(height=10),
+            ft.Container(content=self.full_log_list, expand=True, bgcolor=ft.Colors.WHITE, border_radius=20, padding=20, shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.GREY_200))
+        ], expand=True)
 
     def build_settings_page(self):
         return ft.Column([
@@ -182,135 +252,307 @@ class ModernLightApp:
     # ==========================
     def animate_hover(self, e): e.control.scale = 1.1 if e.data == "true" else 1.0; e.control.update()
     def switch_tab(self, e):
-        if e.control.selected_index == 0: self.content_area.content = self.dashboard_view
-        elif e.control.selected_index == 1: self.refresh_full_logs(); self.content_area.content = self.logs_view
-        elif e.control.selected_index == 2: self.content_area.content = self.settings_view
+        # Flet calls this from a handler thread; the controls are only touched on the loop
+        self.call_ui(self._switch_tab, e.control.selected_index)
+
+    def _switch_tab(self, index):
+        if index == 0: self.content_area.content = self.dashboard_view
+        elif index == 1: self.refresh_full_logs(); self.content_area.content = self.logs_view
+        elif index == 2: self.content_area.content = self.settings_view
         self.page.update()
     
     async def initial_greeting(self):
-        self.speak_system("System ready.")
+        # The greeting is requested first; the heavy clients load while it plays
+        self.queue_system("System ready.")
+        warm_up = threading.Thread(target=self.warm_up_services, name="warm-up", daemon=True)
+        warm_up.start()
+        await self.wait_for_speech()
+        profiler.mark("greeting spoken")
         self.set_status("READY", ft.Colors.GREEN_500)
+        if profiler.enabled:
+            await self.run_blocking(warm_up.join)
+            profiler.mark("warm-up finished")
+            profiler.report()
+
+    def warm_up_services(self):
+        """Loads what the first command needs (SDK imports, clients, cached phrases) after the window is up."""
+        steps = [("Gemini client", gemini.warm_up), ("Google clients", google_clients.warm_up), ("AssemblyAI SDK", self.ears.warm_up)]
+        # Pre-synthesize the fixed system phrases so they play with zero network latency later
+        if os.getenv("TTS_WARMUP", "1") == "1": steps.append(("TTS phrase cache", self.voice.warm_up))
+        for name, step in steps:
+            try:
+                with profiler.measure(f"warm-up: {name}"): step()
+            except Exception as e:
+                print(f"❌ Warm-up error ({name}): {e}")
+
+    # --- TURN SCHEDULER ---
+    # Every voice turn is one asyncio task on Flet's event loop. Blocking SDK calls are awaited
+    # through a small thread pool, and all UI state is only touched from the loop thread.
+    def start_turn(self, handler, *args):
+        """Runs 'handler' as the current turn, cancelling the previous turn if it is still going."""
+        self.cancel_turn()
+        self.turn = self.page.run_task(handler, *args)
+
+    def cancel_turn(self):
+        if self.turn and not self.turn.done(): self.turn.cancel()
+        self.turn = None
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Awaits a blocking call on the worker pool so the UI stays responsive."""
+        return await asyncio.get_running_loop().run_in_executor(self.blocking_pool, partial(fn, *args, **kwargs))
+
+    def call_ui(self, fn, *args):
+        """Runs 'fn' on the event loop thread; safe to call from any thread."""
+        self.page.loop.call_soon_threadsafe(fn, *args)
+
+    def request_update(self, *controls):
+        """
+        Coalesced page.update(): any number of calls within UI_FRAME_SECONDS cause one redraw.
+        Passing the changed controls limits the diff to them (the whole page if any caller passed none).
+        """
+        self.call_ui(self._schedule_update, controls)
+
+    def _schedule_update(self, controls):
+        if controls and self._dirty is not None: self._dirty.update(controls)
+        else: self._dirty = None
+        if self._update_scheduled: return
+        self._update_scheduled = True
+        # A redraw that took longer than a frame pushes the next one out (up to 4 per second), so diffs never hog the loop
+        self.page.loop.call_later(max(UI_FRAME_SECONDS, min(self._update_cost, 0.25)), self._flush_update)
+
+    def _flush_update(self):
+        dirty, self._dirty = self._dirty, set()
+        self._update_scheduled = False
+        started = time.perf_counter()
+        if dirty is None: self.page.update()
+        else:
+            # Controls on a hidden tab are skipped; they are sent when the tab is shown again
+            shown = [control for control in dirty if control.uid and self.page.get_control(control.uid) is control]
+            if shown: self.page.update(*shown)
+        self._update_cost = time.perf_counter() - started
 
     def toggle_recording(self, e):
+        # Flet calls this from a handler thread and the VAD from the mic thread; serialize on the loop
+        self.call_ui(self._toggle_recording)
+
+    def _toggle_recording(self):
         if not self.is_recording:
+            # Barge-in: stop talking at once, then pre-empt whatever the last turn was still doing
+            self.voice.interrupt()
+            self.cancel_turn()
+            tracer.start_turn()
             self.is_recording = True; self.mic_icon.name = ft.Icons.STOP; self.mic_btn.gradient = ft.LinearGradient(colors=[ft.Colors.RED_500, ft.Colors.PINK_600])
             self.visualizer.opacity = 0.4; self.visualizer.scale = 1.6; self.visualizer.bgcolor = ft.Colors.RED_100
-            self.set_status("LISTENING", ft.Colors.RED_500); self.ears.start_recording()
+            self.set_status("LISTENING", ft.Colors.RED_500)
+            # Opening the mic (and the streaming websocket) blocks, so it runs on the worker pool; the turn awaits it
+            self.mic_ready = self.page.loop.run_in_executor(self.blocking_pool, self.open_mic)
         else:
             self.is_recording = False; self.mic_icon.name = ft.Icons.MIC_NONE; self.mic_btn.gradient = ft.LinearGradient(colors=[ft.Colors.BLUE_400, ft.Colors.INDIGO_500])
             self.visualizer.opacity = 0; self.visualizer.scale = 1.0
-            self.set_status("PROCESSING", ft.Colors.ORANGE_400); self.page.update()
-            threading.Thread(target=self.process_recording, daemon=True).start()
+            self.set_status("PROCESSING", ft.Colors.ORANGE_400)
+            self.start_turn(self.run_voice_turn)
         self.page.update()
 
-    def speak_system(self, text, language_code="en"):
+    def open_mic(self):
+        self.ears.stop_barge_in_monitor()  # Joins the monitor thread, which holds the mic
+        try:
+            self.ears.start_recording()
+        except Exception as e:
+            print(f"❌ Microphone error: {e}")
+
+    def on_auto_stop(self):
+        # VAD heard the end of the sentence: behave as if the mic was tapped again
+        self.call_ui(lambda: self.is_recording and self._toggle_recording())
+
+    def on_barge_in(self):
+        # The user started talking over the agent (BARGE_IN_VAD=1): same as tapping the mic
+        self.call_ui(lambda: self.is_recording or self._toggle_recording())
+
+    def show_live_caption(self, text):
+        # Partial transcripts from streaming STT, shown under the mic while the user talks
+        self.call_ui(self._set_caption, text or "Listening...")
+
+    def _set_caption(self, text):
+        self.caption_text.value = text
+        self.request_update(self.caption_text)
+
+    async def say(self, text, language_code="en"):
+        """Logs and speaks 'text', returning once it has been played."""
         self.add_log_entry(text, "System", ft.Colors.INDIGO_400)
-        self.voice.speak(text, language_code=language_code)
+        await self.run_blocking(self.voice.speak, text, language_code=language_code)
+
+    def queue_system(self, text, language_code="en", pause=0.0):
+        """Like say(), but returns immediately; await wait_for_speech() to block."""
+        self.add_log_entry(text, "System", ft.Colors.INDIGO_400)
+        self.voice.enqueue(text, language_code=language_code, pause=pause)
+
+    async def wait_for_speech(self):
+        await self.run_blocking(self.voice.wait_until_idle)
 
     def parse_number_word(self, text):
-        text = text.lower()
-        word_map = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
-        digits = re.findall(r'\d+', text)
-        if digits: return int(digits[0])
-        for word, num in word_map.items():
-            if word in text: return num
-        return None
-
-    def process_recording(self):
-        time.sleep(0.5)
-        transcript = self.ears.stop_recording()
+        return parse_number_word(text)
+
+    async def run_voice_turn(self):
+        try:
+            with tracer.span("turn"):
+                await self.process_recording()
+        finally:
+            self.ears.stop_barge_in_monitor()
+
+    async def process_recording(self):
+        if self.mic_ready: await self.mic_ready
+        transcript = await self.run_blocking(self.ears.stop_recording)
+        self._set_caption("Tap to Speak")
         if not transcript: self.set_status("READY", ft.Colors.GREEN_500); return
         self.add_log_entry(f"{transcript}", "User", ft.Colors.GREY_700)
         self.set_status("THINKING", ft.Colors.PURPLE_300)
-        
-        intent_data = determine_intent(transcript)
+
+        intent_data = await self.run_blocking(determine_intent, transcript)
         action = intent_data.action; lang = intent_data.language
-        self.add_log_entry(f"Action: {action} | Lang: {lang} | Key: {intent_data.keywords}", "Intent", ft.Colors.BLUE_GREY_400)
+        self.add_log_entry(f"Action: {action} | Lang: {lang} | Key: {intent_data.keywords} | Conf: {intent_data.confidence:.2f}", "Intent", ft.Colors.BLUE_GREY_400)
+        self.ears.start_barge_in_monitor(self.on_barge_in)
 
         if action == "ANALYZE_NEW":
-            if lang == "hi": self.speak_system("Thik hai. Inbox scan kar raha hoon.", language_code="hi")
-            else: self.speak_system("Sure, scanning your inbox now.")
-            self.run_analysis_workflow(use_cache=False, language=lang)
-            
+            if lang == "hi": await self.say("Thik hai. Inbox scan kar raha hoon.", language_code="hi")
+            else: await self.say("Sure, scanning your inbox now.")
+            await self.run_analysis_workflow(use_cache=False, language=lang)
+
         # --- CHANGED: Renamed Action ---
         elif action == "SUMMARIZE_SPECIFIC":
             target = intent_data.keywords
             if target and target.lower() != "none":
                 # Calls the generic explainer (which handles English OR Hindi internally)
-                self.explain_specific_email(target, language=lang)
+                await self.explain_specific_email(target, language=lang)
             else:
-                self.speak_system("Which email?", language_code=lang)
-                
-        elif action == "GET_SENTIMENT_STATS": self.run_sentiment_report()
-        elif action == "FILTER_BY_CATEGORY": self.run_analysis_workflow(filter_keyword=intent_data.keywords, use_cache=False)
-        elif action == "DRAFT_REPLY": self.run_drafting_workflow(intent_data.keywords)
+                await self.say("Which email?", language_code=lang)
+
+        elif action == "GET_SENTIMENT_STATS": await self.run_sentiment_report()
+        elif action == "FILTER_BY_CATEGORY": await self.run_analysis_workflow(filter_keyword=intent_data.keywords, use_cache=False)
+        elif action == "DRAFT_REPLY": await self.run_drafting_workflow(intent_data.keywords)
         elif action == "EXIT":
-            self.speak_system("Goodbye.")
+            await self.say("Goodbye.")
+            self.voice.close()
             self.page.window.destroy()
-        else: self.speak_system("I didn't understand."); self.set_status("READY", ft.Colors.GREEN_500)
+        else: await self.say("I didn't understand."); self.set_status("READY", ft.Colors.GREEN_500)
 
     # --- CORE WORKFLOW ---
-    def run_analysis_workflow(self, language="en", filter_keyword=None, use_cache=False):
+    async def run_analysis_workflow(self, language="en", filter_keyword=None, use_cache=False):
         self.set_status("ANALYZING", ft.Colors.PURPLE_500)
-        
+
         if not use_cache: self.show_loading_state()
-        self.col_positive.controls.clear(); self.col_neutral.controls.clear(); self.col_negative.controls.clear()
-        
+        for col in (self.col_positive, self.col_neutral, self.col_negative): col.controls.clear(); col.data = []
+
         if use_cache and self.cached_analyses:
             analyses_data = self.cached_analyses
+            self.show_results_state()
+            for item in analyses_data:
+                if filter_keyword and filter_keyword.lower() not in (item['data'].category + item['data'].summary).lower(): continue
+                self.add_dashboard_card(item['id'], item['data'])
+            self.request_update()
         else:
             try:
-                email_bot = EmailManager()
-                emails = email_bot.fetch_recent_emails(count=6)
-                if not emails:
-                    self.speak_system("No emails found.", language_code=language)
-                    self.show_empty_state(); self.set_status("READY", ft.Colors.GREEN_500); return
-                
+                email_bot = await self.run_blocking(self.email_factory)
+                self.email_bot = email_bot
+                self.drafts.cancel_all()  # Replies speculated for the previous scan are no longer wanted
+                streaming = bool(SCAN_QUERY or SCAN_LABELS or SCAN_AFTER or SCAN_BEFORE or SCAN_LIMIT)
+                if streaming:
+                    # Whole-mailbox triage: pages stream in from Gmail while earlier ones are analyzed
+                    emails = email_bot.scan_emails(query=SCAN_QUERY, label_ids=SCAN_LABELS, after=SCAN_AFTER, before=SCAN_BEFORE, limit=SCAN_LIMIT or None)
+                else:
+                    # Delta sync: only mail that arrived since the last scan is fetched from Gmail
+                    emails = await self.run_blocking(email_bot.sync_recent_emails, count=self.scan_count)
+                    self.add_log_entry(f"{len(email_bot.last_sync_added)} new email(s) since last scan", "System", ft.Colors.BLUE_GREY_400)
+                    if not emails:
+                        await self.say("No emails found.", language_code=language)
+                        self.show_empty_state(); self.set_status("READY", ft.Colors.GREEN_500); return
+
+                # Fan out to Gemini; each card lands on the dashboard the moment its analysis is back
+                self.show_results_state()
                 analyses_data = []
-                for i, mail in enumerate(emails):
-                    full_text = f"Subject: {mail['subject']}\nFrom: {mail['sender']}\nContent: {mail['snippet']}"
-                    analysis_result = analyze_email(full_text)
-                    email_bot.log_to_sheet(analysis_result)
-                    analyses_data.append({'id': i+1, 'data': analysis_result})
-                self.cached_analyses = analyses_data
+                counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
+                position = (lambda: (email_bot.scanned, email_bot.scan_estimate)) if streaming else (lambda: (len(emails), len(emails)))
+                self.show_scan_progress(counts, *position())
+                sheet_writer = SheetWriter(email_bot)
+                results = self.engine.iter_stream(emails)
+                step_future = None
+                try:
+                    while True:
+                        step_future = self.blocking_pool.submit(next, results, None)
+                        step = await asyncio.wrap_future(step_future)
+                        if step is None: break
+                        i, mail, analysis_result = step
+                        sheet_writer.submit(analysis_result)
+                        item = {'id': i+1, 'data': analysis_result, 'message_id': mail['id']}
+                        analyses_data.append(item)
+                        counts[analysis_result.sentiment] = counts.get(analysis_result.sentiment, 0) + 1
+                        self.show_scan_progress(counts, *position())
+                        # Only the negatives the user hears about get a speculative reply; drafts share Gemini's quota with the scan
+                        if analysis_result.sentiment == "Negative" and counts["Negative"] <= MAX_READOUT: self.speculate_draft(item)
+                        if filter_keyword and filter_keyword.lower() not in (analysis_result.category + analysis_result.summary).lower(): continue
+                        self.add_dashboard_card(item['id'], analysis_result)
+                finally:
+                    # Also runs when the turn is pre-empted: keep what is on screen and still log it
+                    # Stops the Gmail reader of a streaming scan; if the turn was cancelled mid-next(), once that returns
+                    if step_future: step_future.add_done_callback(lambda _: results.close())
+                    else: results.close()
+                    sheet_writer.close()  # Remaining rows go out in the background
+                    analyses_data.sort(key=lambda item: item['id'])
+                    self.cached_analyses = analyses_data
+                    self.show_scan_progress(counts, *position(), done=True)
+                if not analyses_data:
+                    await self.say("No emails found.", language_code=language)
+                    self.show_empty_state(); self.set_status("READY", ft.Colors.GREEN_500); return
+                # Results arrive in completion order: make sure the negatives read out (inbox order) have their reply queued
+                for item in [item for item in analyses_data if item['data'].sentiment == "Negative"][:MAX_READOUT]: self.speculate_draft(item)
             except Exception as e:
-                self.speak_system("Error occurred."); print(e); self.show_empty_state(); return
-
-        self.show_results_state() 
-        for item in analyses_data:
-            if filter_keyword and filter_keyword.lower() not in (item['data'].category + item['data'].summary).lower(): continue 
-            self.add_dashboard_card(item['id'], item['data'])
-        self.page.update()
+                await self.say("Error occurred."); print(e); self.show_empty_state(); return
 
         negative_count = 0
         summaries = []
         for item in analyses_data:
             analysis = item['data']
-            if filter_keyword and filter_keyword.lower() not in (analysis.category + analysis.summary).lower(): continue 
+            if filter_keyword and filter_keyword.lower() not in (analysis.category + analysis.summary).lower(): continue
 
             text = f"Email {item['id']} from {analysis.customer_name}: {analysis.summary}. Recommendation: {analysis.recommendation}"
             if filter_keyword: summaries.append(text)
             elif analysis.sentiment == "Negative": negative_count += 1; summaries.append(text)
 
         if language == "hi":
-             self.speak_system(f"Mujhe {negative_count} negative emails mile hain.", language_code="hi")
+             # One batched translation request for everything Hindi mode may read, started before we talk
+             negatives = [item for item in analyses_data if item['data'].sentiment == "Negative"][:MAX_READOUT]
+             self.translations.prefetch([self.readout_text(item) for item in negatives] + [self.explain_text(item) for item in analyses_data[:MAX_READOUT]])
+             await self.say(f"Mujhe {negative_count} negative emails mile hain.", language_code="hi")
              # --- HINDI LOOP ---
-             for item in analyses_data:
-                 if item['data'].sentiment == "Negative":
-                     details = f"{item['data'].summary}. Recommendation: {item['data'].recommendation}"
-                     hindi_details = translate_to_hindi(details)
-                     self.speak_system(f"Email {item['id']}: {hindi_details}", language_code="hi")
+             hindi_details = await self.run_blocking(self.translations.translate_many, [self.readout_text(item) for item in negatives])
+             for item, details in zip(negatives, hindi_details):
+                 self.queue_system(f"Email {item['id']}: {details}", language_code="hi", pause=0.5)
+             await self.wait_for_speech()
         else:
             if summaries:
-                self.speak_system(f"Analysis complete.")
-                for s in summaries: self.voice.speak(s); time.sleep(0.5)
+                await self.say(f"Analysis complete.")
+                for s in summaries[:MAX_READOUT]: self.voice.enqueue(s, pause=0.5)
+                if len(summaries) > MAX_READOUT: self.queue_system(f"{len(summaries) - MAX_READOUT} more are on the dashboard.", pause=0.5)
+                await self.wait_for_speech()
             else:
-                self.speak_system("All recent feedback is positive.")
-        
+                await self.say("All recent feedback is positive.")
+
         self.set_status("READY", ft.Colors.GREEN_500)
 
+    def show_scan_progress(self, counts, scanned, estimate, done=False):
+        """Running totals above the dashboard columns while a scan streams in."""
+        analyzed = sum(counts.values())
+        total = f" of ~{estimate:,}" if estimate and not done else ""
+        self.scan_progress_text.value = (f"{'Scanned' if done else 'Scanning'} {scanned:,}{total} · analyzed {analyzed:,} · "
+                                         f"{counts['Positive']:,} positive · {counts['Neutral']:,} neutral · {counts['Negative']:,} negative")
+        self.scan_progress_bar.visible = not done
+        self.scan_progress_bar.value = min(1.0, analyzed / estimate) if estimate else None
+        self.request_update(self.scan_progress_text, self.scan_progress_bar)
+
     # --- HELPERS (Renamed to be generic) ---
-    def explain_specific_email(self, target_keyword, language="en"):
+    def readout_text(self, item): return f"{item['data'].summary}. Recommendation: {item['data'].recommendation}"
+    def explain_text(self, item): return f"Email {item['id']} from {item['data'].customer_name}. {item['data'].summary}"
+
+    async def explain_specific_email(self, target_keyword, language="en"):
         self.set_status("ANALYZING", ft.Colors.ORANGE_400)
         target_id = self.parse_number_word(target_keyword)
         target_item = None
@@ -323,53 +565,108 @@ class ModernLightApp:
 
         if not target_item:
             msg = f"Email {target_keyword} nahi mila." if language == "hi" else f"I couldn't find email {target_keyword}."
-            self.speak_system(msg, language_code=language)
+            await self.say(msg, language_code=language)
             self.set_status("READY", ft.Colors.GREEN_500)
             return
 
         # Prepare Text
-        summary_text = f"Email {target_item['id']} from {target_item['data'].customer_name}. {target_item['data'].summary}"
-        
-        # Translate if needed
+        summary_text = self.explain_text(target_item)
+
+        # Translate if needed (memoized; a miss also translates the next few emails, likely asked about next)
         if language == "hi":
             self.set_status("TRANSLATING", ft.Colors.ORANGE_400)
-            summary_text = translate_to_hindi(summary_text)
-        
-        self.speak_system(summary_text, language_code=language)
+            start = self.cached_analyses.index(target_item)
+            await self.run_blocking(self.translations.translate_many, [self.explain_text(item) for item in self.cached_analyses[start:start + MAX_READOUT]])
+            summary_text = await self.run_blocking(self.translations.translate, summary_text)
+
+        await self.say(summary_text, language_code=language)
         self.set_status("READY", ft.Colors.GREEN_500)
 
-    def run_drafting_workflow(self, target_keyword):
+    def speculate_draft(self, item):
+        # Low-priority background reply, so DRAFT_REPLY later only needs drafts().create
+        analysis = item['data']
+        self.draft_refs[item['message_id']] = item['id']
+        self.drafts.submit(item['message_id'], analysis.customer_name, analysis.summary, analysis.sentiment, priority=item['id'])
+
+    def auto_draft(self, job):
+        # AUTO_DRAFT=1: the speculated reply goes straight into Gmail drafts
+        ref = self.draft_refs.get(job.key)
+        if not ref or not self.email_bot: return
+        if self.draft_once(self.email_bot, job.key, ref, job.text): self.add_log_entry(f"Auto-drafted reply for email #{ref}", "System", ft.Colors.BLUE_GREY_400)
+
+    def draft_once(self, email_bot, message_id, ref, body_text):
+        """
+        Creates the reply draft unless the email already has one (auto-drafts and DRAFT_REPLY may race).
+        Returns whether this attempt succeeded, or None if a draft already exists. Blocking: worker threads only.
+        """
+        if message_id and not self.claim_draft(message_id): return None
+        created = False
+        try:
+            created = email_bot.create_draft(to_email="customer@example.com", subject=f"Re: Support (Ref #{ref})", body_text=body_text)
+        finally:
+            if message_id: self.finish_draft(message_id, created)
+        return created
+
+    def claim_draft(self, message_id):
+        """
+        One Gmail draft per email. True: the caller creates it now. Otherwise blocks while another
+        attempt is running, and returns False once the email has a draft (or claims it if that attempt failed).
+        """
+        while True:
+            with self.draft_lock:
+                if message_id in self.drafted_ids: return False
+                running = self.drafting.get(message_id)
+                if running is None:
+                    self.drafting[message_id] = threading.Event()
+                    return True
+            running.wait()
+
+    def finish_draft(self, message_id, created):
+        with self.draft_lock:
+            if created: self.drafted_ids.add(message_id)
+            running = self.drafting.pop(message_id, None)
+        if running: running.set()
+
+    async def run_drafting_workflow(self, target_keyword):
         self.set_status("DRAFTING", ft.Colors.ORANGE_500)
         target_id = self.parse_number_word(target_keyword)
         target_item = None
-        
+
         if target_id:
-            self.speak_system(f"Drafting for email #{target_id}...")
+            await self.say(f"Drafting for email #{target_id}...")
             for item in self.cached_analyses:
                 if item['id'] == target_id: target_item = item; break
         else:
-            self.speak_system(f"Drafting for {target_keyword}...")
+            await self.say(f"Drafting for {target_keyword}...")
             for item in self.cached_analyses:
                 if target_keyword.lower() in item['data'].customer_name.lower(): target_item = item; break
-        
-        if not target_item: self.speak_system(f"I couldn't find that email."); self.set_status("READY", ft.Colors.GREEN_500); return
+
+        if not target_item: await self.say(f"I couldn't find that email."); self.set_status("READY", ft.Colors.GREEN_500); return
+
+        message_id = target_item.get('message_id')
+        if message_id in self.drafted_ids:
+            await self.say("That draft is already in your Gmail."); self.set_status("READY", ft.Colors.GREEN_500); return
 
         analysis = target_item['data']
-        reply_body = generate_email_reply(analysis.customer_name, analysis.summary, analysis.sentiment)
-        email_bot = EmailManager()
-        success = email_bot.create_draft(to_email="customer@example.com", subject=f"Re: Support (Ref #{target_item['id']})", body_text=reply_body)
-        
+        reply_body = await self.run_blocking(self.drafts.take, message_id) if message_id else None
+        if not reply_body: reply_body = await self.run_blocking(generate_email_reply, analysis.customer_name, analysis.summary, analysis.sentiment)
+        email_bot = self.email_bot or await self.run_blocking(self.email_factory)
+        # An auto-draft of the same email may still be talking to Gmail: draft_once waits for it rather than draft twice
+        success = await self.run_blocking(self.draft_once, email_bot, message_id, target_item['id'], reply_body)
+        if success is None:
+            await self.say("That draft is already in your Gmail."); self.set_status("READY", ft.Colors.GREEN_500); return
+
         if success:
-            self.speak_system(f"Draft created successfully.")
-            self.page.snack_bar.open = True; self.page.update()
-        else: self.speak_system("Failed to create draft.")
+            await self.say(f"Draft created successfully.")
+            self.page.snack_bar.open = True; self.request_update()
+        else: await self.say("Failed to create draft.")
         self.set_status("READY", ft.Colors.GREEN_500)
 
-    def run_sentiment_report(self):
+    async def run_sentiment_report(self):
         if self.cached_analyses:
             source = self.cached_analyses
             self.add_log_entry("Generating stats...", "System", ft.Colors.PURPLE_300)
-        else: self.speak_system("Please scan emails first."); return
+        else: await self.say("Please scan emails first."); return
 
         pos, neg, neu = 0, 0, 0
         for item in source:
@@ -377,25 +674,74 @@ class ModernLightApp:
             if a.sentiment == "Negative": neg += 1
             elif a.sentiment == "Positive": pos += 1
             else: neu += 1
-        self.speak_system(f"Session Stats: {pos} positive, {neg} negative, {neu} neutral."); self.set_status("READY", ft.Colors.GREEN_500)
+        await self.say(f"Session Stats: {pos} positive, {neg} negative, {neu} neutral."); self.set_status("READY", ft.Colors.GREEN_500)
 
     def add_dashboard_card(self, ID, analysis):
         if analysis.sentiment == "Positive": bg = ft.Colors.GREEN_50; border = ft.Colors.GREEN_200; icon = ft.Colors.GREEN_600; col_ref = self.col_positive
         elif analysis.sentiment == "Negative": bg = ft.Colors.RED_50; border = ft.Colors.RED_200; icon = ft.Colors.RED_600; col_ref = self.col_negative
         else: bg = ft.Colors.BLUE_50; border = ft.Colors.BLUE_200; icon = ft.Colors.BLUE_600; col_ref = self.col_neutral
 
-        card = ft.Container(content=ft.Column([ft.Row([ft.Container(content=ft.Text(f"#{ID}", weight="bold", color=ft.Colors.WHITE, size=10), bgcolor=icon, padding=5, border_radius=5), ft.Text(analysis.customer_name, weight="bold", color=ft.Colors.GREY_800, size=12, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS)]), ft.Container(height=5), ft.Text(analysis.summary, size=11, color=ft.Colors.GREY_700), ft.Divider(height=10, color=ft.Colors.TRANSPARENT), ft.Row([ft.Icon(ft.Icons.PSYCHOLOGY, size=12, color=ft.Colors.GREY_500), ft.Text(f"Tone: {analysis.tone}", size=10, color=ft.Colors.GREY_500)])]), bgcolor=bg, padding=10, border_radius=10, border=ft.border.all(1, border), animate_opacity=300)
-        col_ref.controls.append(card)
+        card = StaticContainer(data=ID, content=ft.Column([ft.Row([ft.Container(content=ft.Text(f"#{ID}", weight="bold", color=ft.Colors.WHITE, size=10), bgcolor=icon, padding=5, border_radius=5), ft.Text(analysis.customer_name, weight="bold", color=ft.Colors.GREY_800, size=12, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS)]), ft.Container(height=5), ft.Text(analysis.summary, size=11, color=ft.Colors.GREY_700), ft.Divider(height=10, color=ft.Colors.TRANSPARENT), ft.Row([ft.Icon(ft.Icons.PSYCHOLOGY, size=12, color=ft.Colors.GREY_500), ft.Text(f"Tone: {analysis.tone}", size=10, color=ft.Colors.GREY_500)])]), bgcolor=bg, padding=10, border_radius=10, border=ft.border.all(1, border), animate_opacity=300)
+        # Results stream in completion order, so slot each card back into inbox order
+        position = bisect.bisect(col_ref.data, ID)
+        col_ref.data.insert(position, ID)
+        col_ref.controls.insert(position, card)
+        self.request_update(col_ref)
     
-    def set_status(self, text, color): self.status_text.value = text; self.status_text.color = color; self.status_ring.bgcolor = color; self.page.update()
-    def add_log_entry(self, message, sender, color=ft.Colors.GREY_800):
-        self.log_history.append({"msg": message, "sender": sender, "color": color, "type": "text"})
-        if self.content_area.content == self.logs_view: self.refresh_full_logs()
+    def set_status(self, text, color): self.status_text.value = text; self.status_text.color = color; self.status_ring.bgcolor = color; self.request_update(self.status_text, self.status_ring)
+    def add_log_entry(self, message, sender, color=ft.Colors.GREY_800): self.call_ui(self._append_log, message, sender, color)
+    def _append_log(self, message, sender, color):
+        # Append-only: one new line per entry, never a rebuild of the whole list
+        entry = self.logs.append(message, sender, color)
+        if not self.log_view_at_tail: return  # Reading older pages; the new line shows on the way back down
+        lines = self.full_log_list.controls
+        lines.append(self.log_line(entry))
+        if len(lines) > LOG_VIEW_MAX_LINES: del lines[:len(lines) - LOG_VIEW_MAX_LINES]
+        self.request_update(self.full_log_list)
+    def log_line(self, entry): return StaticText(f"{entry['sender']}: {entry['msg']}", color=entry["color"], data=entry["seq"])
+
+    def on_log_scroll(self, e):
+        if e.event_type != "end": return
+        self.call_ui(self._on_log_scroll, e.pixels, e.min_scroll_extent, e.max_scroll_extent)
+
+    def _on_log_scroll(self, pixels, min_extent, max_extent):
+        lines = self.full_log_list.controls
+        if pixels <= min_extent + 50:
+            # The older page is read from disk on the worker pool, then inserted back on the loop
+            before = lines[0].data if lines else self.logs.next_seq
+            page = self.blocking_pool.submit(self.logs.page_before, before, LOG_PAGE_SIZE)
+            page.add_done_callback(lambda done: self.call_ui(self.prepend_logs, done.result()))
+        elif pixels >= max_extent - 50 and not self.log_view_at_tail: self.show_latest_logs()
+
+    def prepend_logs(self, older):
+        lines = self.full_log_list.controls
+        if not older or (lines and older[-1]["seq"] >= lines[0].data): return  # A second scroll event already loaded this page
+        lines[0:0] = [self.log_line(entry) for entry in older]
+        if len(lines) > LOG_VIEW_MAX_LINES:
+            # Keep the view bounded: drop the newest lines and stop following the tail until the user scrolls back down
+            del lines[LOG_VIEW_MAX_LINES:]
+            self.log_view_at_tail = False
+        self.request_update(self.full_log_list)
+
+    def show_latest_logs(self):
+        self.full_log_list.controls = [self.log_line(entry) for entry in list(self.logs.recent)]
+        self.log_view_at_tail = True
+        self.request_update(self.full_log_list)
+    def refresh_latency_table(self):
+        self.latency_table.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(stage, size=12))] + [ft.DataCell(ft.Text(value, size=12)) for value in [str(s["count"]), f"{s['p50']:.0f}", f"{s['p95']:.0f}", f"{s['p99']:.0f}", f"{s['max']:.0f}"]])
+            for stage, s in tracer.stats().items()
+        ]
+
+    def export_traces(self, e):
+        count = tracer.export_jsonl(TRACE_EXPORT_PATH)
+        self.add_log_entry(f"Exported {count} trace span(s) to {TRACE_EXPORT_PATH}", "System", ft.Colors.BLUE_GREY_400)
+
     def refresh_full_logs(self):
-        self.full_log_list.controls.clear()
-        for item in self.log_history:
-            if item["type"] == "text": self.full_log_list.controls.append(ft.Text(f"{item['sender']}: {item['msg']}", color=item['color']))
-        self.page.update()
+        # Log lines are appended as they arrive (_append_log); only the latency table is recomputed
+        if not self.log_view_at_tail: self.show_latest_logs()
+        self.refresh_latency_table()
+        self.request_update()
 
 def main(page: ft.Page): ModernLightApp(page)
 if __name__ == "__main__": ft.app(target=main)
\ No newline at end of file
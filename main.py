@@ -1,6 +1,7 @@
-import time
 from services.email_manager import EmailManager
-from services.llm_brain import analyze_email
+from services.analysis_engine import AnalysisEngine
+from services.analysis_cache import AnalysisCache
+from services.sheet_writer import SheetWriter
 from services.murf_tts import VoiceEngine
 from services.transcriber import Transcriber
 
@@ -16,8 +17,8 @@ def main():
 
     # 3. Main Listening Loop
     while True:
-        # The agent listens for 5 seconds
-        command = ears.listen() 
+        # The agent listens until VAD hears the end of the sentence
+        command = ears.listen(timeout=15)
         
         # Sanitize input (handle empty audio or noise)
         if not command:
@@ -37,6 +38,7 @@ def main():
         # Command: EXIT
         elif "exit" in command or "stop" in command or "quit" in command:
             voice.speak("Shutting down. Goodbye.")
+            voice.close()
             break
         
         # Unknown Command
@@ -65,19 +67,20 @@ def run_analysis_workflow(voice):
         negative_count = 0
         high_priority_summaries = []
 
-        # Process each email
-        for mail in emails:
-            print(f"   > Analyzing: {mail['subject']}...")
-            
-            # Prepare text for the Brain
-            full_text = f"Subject: {mail['subject']}\nFrom: {mail['sender']}\nContent: {mail['snippet']}"
-            
-            # A. BRAIN: Analyze Sentiment
-            analysis = analyze_email(full_text)
-            
-            # B. SHEETS: Log Data
-            email_bot.log_to_sheet(analysis)
+        # B. SHEETS: Rows are buffered and appended in bulk off the hot path
+        sheet_writer = SheetWriter(email_bot)
+
+        # Process emails concurrently; on_result fires as each one finishes (completion order),
+        # and analyze_all returns the analyses in inbox order for the readout below
+        def on_result(i, mail, analysis):
+            print(f"   > Analyzed: {mail['subject']}...")
+            sheet_writer.submit(analysis)
+
+        # A. BRAIN: Analyze Sentiment
+        analyses = AnalysisEngine(cache=AnalysisCache()).analyze_all(emails, on_result=on_result)
+        sheet_writer.flush()
 
+        for analysis in analyses:
             # C. MEMORY: Track critical issues
             if analysis.sentiment == "Negative":
                 negative_count += 1
@@ -91,9 +94,10 @@ def run_analysis_workflow(voice):
             voice.speak("Here is the summary of the critical issues.")
             
             for summary in high_priority_summaries:
-                voice.speak(summary)
-                time.sleep(0.5) # Natural pause between items
+                voice.enqueue(summary, pause=0.5) # Natural pause between items, as silence
+            voice.wait_until_idle()
 
+        sheet_writer.close(wait=True, timeout=30)
         voice.speak("All data has been logged to the dashboard.")
 
     except Exception as e:
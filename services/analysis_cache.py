@@ -0,0 +1,91 @@
+import os
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from services.llm_brain import EmailAnalysis, analysis_fingerprint
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.db")
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+
+
+class AnalysisCache:
+    """
+    On-disk (SQLite) store of EmailAnalysis results.
+    - Keyed by Gmail message ID + a fingerprint of the prompt, schema and model,
+      so editing the prompt or switching models automatically misses old entries
+    - Least-recently-used rows are evicted once 'max_entries' is exceeded
+    """
+
+    def __init__(self, path=None, max_entries=None, fingerprint=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.fingerprint = fingerprint or analysis_fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    message_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (message_id, fingerprint)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_used ON analyses (last_used)")
+
+    def get(self, message_id):
+        """Returns the cached EmailAnalysis for this message, or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT payload FROM analyses WHERE message_id = ? AND fingerprint = ?",
+                (message_id, self.fingerprint)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE analyses SET last_used = ? WHERE message_id = ? AND fingerprint = ?",
+                (time.time(), message_id, self.fingerprint)
+            )
+        try:
+            return EmailAnalysis.model_validate_json(row[0])
+        except Exception:
+            return None
+
+    def put(self, message_id, analysis):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (message_id, fingerprint, payload, last_used) VALUES (?, ?, ?, ?)",
+                (message_id, self.fingerprint, analysis.model_dump_json(), time.time())
+            )
+            self._evict()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        # Caller holds the lock. Drops the least recently used rows beyond the cap.
+        overflow = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM analyses WHERE rowid IN (SELECT rowid FROM analyses ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
@@ -0,0 +1,196 @@
+import os
+import math
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from services.tracing import tracer
+from services.llm_brain import analyze_email, analyze_email_batch, analysis_failed, plan_batches, MAX_BATCH_SIZE
+
+load_dotenv()
+
+# How many Gemini requests may be in flight at once during a scan
+DEFAULT_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "8"))
+# Pack several emails into one Gemini request (ANALYSIS_BATCH=0 for one request per email)
+DEFAULT_BATCHING = os.getenv("ANALYSIS_BATCH", "1") == "1"
+# Emails read ahead of the analysis stage in streaming scans; the reader blocks when it is full
+DEFAULT_QUEUE_SIZE = int(os.getenv("SCAN_QUEUE_SIZE", "200"))
+
+# The first batches of a streaming scan wait this long for the inbox to fill, so they are not sized by whatever arrived first
+FIRST_BATCH_WAIT = 0.5
+
+_END = object()  # Reader -> analysis: the scan is over
+
+
+def format_email_for_analysis(mail):
+    """Builds the text block the Brain sees for one fetched email."""
+    return f"Subject: {mail['subject']}\nFrom: {mail['sender']}\nContent: {mail['snippet']}"
+
+
+class AnalysisEngine:
+    """
+    Fans out analyze_email calls over a bounded thread pool.
+    - iter_analyses(): yields each result as soon as Gemini answers (completion order)
+    - analyze_all(): same work, but returns the results in inbox order
+    - iter_stream(): like iter_analyses() for an open-ended iterable such as EmailManager.scan_emails()
+    With a 'cache' (services.analysis_cache.AnalysisCache), emails analyzed in an
+    earlier run are served from disk and never reach Gemini.
+    With 'batching', emails are packed into multi-email requests: just enough per request
+    to keep every worker busy, capped by the token budget in llm_brain.plan_batches.
+    """
+
+    def __init__(self, max_workers=None, analyze_fn=analyze_email, cache=None,
+                 batching=None, analyze_batch_fn=analyze_email_batch):
+        self.max_workers = max(1, max_workers or DEFAULT_WORKERS)
+        self.analyze_fn = analyze_fn
+        self.cache = cache
+        self.batching = DEFAULT_BATCHING if batching is None else batching
+        self.analyze_batch_fn = analyze_batch_fn
+
+    def iter_analyses(self, emails):
+        """Yields (index, mail, analysis) tuples; index is the email's position in the inbox list."""
+        if not emails: return
+
+        # Cache hits are yielded straight away; only the misses go to the pool
+        pending = []
+        for i, mail in enumerate(emails):
+            cached = self.cache.get(mail["id"]) if self.cache is not None and mail.get("id") else None
+            if cached is not None: yield i, mail, cached
+            else: pending.append((i, mail))
+        if not pending: return
+
+        groups = self._group(pending)
+        workers = min(self.max_workers, len(groups))
+        turn_id = tracer.current_turn
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis") as pool:
+            futures = {pool.submit(self._analyze_group, group, turn_id): group for group in groups}
+            for future in as_completed(futures):
+                group = futures[future]
+                for (i, mail), analysis in zip(group, future.result()):
+                    yield i, mail, analysis
+
+    def iter_stream(self, emails, queue_size=None):
+        """
+        Yields (index, mail, analysis) like iter_analyses(), but 'emails' may be any iterable, however long.
+        A reader thread pulls emails into a bounded queue and blocks whenever analysis falls behind,
+        and at most max_workers requests are in flight, so memory stays flat regardless of inbox size.
+        Indexes count emails in the order the iterable produced them.
+        """
+        inbox = queue.Queue(maxsize=queue_size or DEFAULT_QUEUE_SIZE)
+        stop = threading.Event()
+        failure = []
+        reader = threading.Thread(target=self._read_into, args=(emails, inbox, stop, failure), name="scan-reader", daemon=True)
+        reader.start()
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        turn_id = tracer.current_turn  # The scan's turn, even if the user starts another one meanwhile
+        in_flight = {}
+        index = 0
+        reading = True
+        try:
+            while reading or in_flight:
+                free = self.max_workers - len(in_flight)
+                if reading and free > 0:
+                    # Block for input only when nothing is being analyzed
+                    first = self.batching and index == 0 and not in_flight
+                    chunk, reading = self._take(inbox, free * (MAX_BATCH_SIZE if self.batching else 1), block=not in_flight,
+                                                linger=FIRST_BATCH_WAIT if first else 0.0)
+                    pending = []
+                    for mail in chunk:
+                        cached = self.cache.get(mail["id"]) if self.cache is not None and mail.get("id") else None
+                        if cached is not None: yield index, mail, cached
+                        else: pending.append((index, mail))
+                        index += 1
+                    for group in self._group(pending, slots=free):
+                        in_flight[pool.submit(self._analyze_group, group, turn_id)] = group
+                if not in_flight: continue
+                # Wake up for new input too, unless every worker is busy anyway
+                done, _ = wait(in_flight, timeout=0.05 if reading and len(in_flight) < self.max_workers else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = in_flight.pop(future)
+                    for (i, mail), analysis in zip(group, future.result()):
+                        yield i, mail, analysis
+            if failure: raise failure[0]
+        finally:
+            # Also runs when the consumer stops early: the reader notices within one put() timeout,
+            # and requests already running still land in the cache
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _put(inbox, item, stop):
+        """Blocking put that gives up once 'stop' is set. Returns False if it gave up."""
+        while not stop.is_set():
+            try:
+                inbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_into(self, emails, inbox, stop, failure):
+        try:
+            for mail in emails:
+                if not self._put(inbox, mail, stop): break
+        except Exception as e:
+            failure.append(e)
+        finally:
+            if hasattr(emails, "close"): emails.close()
+            self._put(inbox, _END, stop)
+
+    @staticmethod
+    def _take(inbox, limit, block, linger=0.0):
+        """
+        Returns (up to 'limit' queued emails, whether the scan is still going).
+        With 'linger', keeps waiting up to that many seconds after the first email for the chunk to fill.
+        """
+        chunk = []
+        try:
+            item = inbox.get() if block else inbox.get_nowait()
+            deadline = time.monotonic() + linger
+            while True:
+                if item is _END: return chunk, False
+                chunk.append(item)
+                if len(chunk) >= limit: return chunk, True
+                remaining = deadline - time.monotonic()
+                item = inbox.get(timeout=remaining) if remaining > 0 else inbox.get_nowait()
+        except queue.Empty:
+            return chunk, True
+
+    def _group(self, pending, slots=None):
+        if not self.batching or len(pending) < 2:
+            return [[item] for item in pending]
+        per_request = min(MAX_BATCH_SIZE, max(2, math.ceil(len(pending) / (slots or self.max_workers))))
+        texts = [format_email_for_analysis(mail) for _, mail in pending]
+        return [[pending[k] for k in batch] for batch in plan_batches(texts, max_batch_size=per_request)]
+
+    def _analyze_group(self, group, turn_id=None):
+        with tracer.span("analysis", turn_id=turn_id, emails=len(group)):
+            if len(group) == 1:
+                return [self._analyze(group[0][1])]
+            analyses = self.analyze_batch_fn([format_email_for_analysis(mail) for _, mail in group])
+        for (_, mail), analysis in zip(group, analyses):
+            self._remember(mail, analysis)
+        return analyses
+
+    def _analyze(self, mail):
+        analysis = self.analyze_fn(format_email_for_analysis(mail))
+        self._remember(mail, analysis)
+        return analysis
+
+    def _remember(self, mail, analysis):
+        # Never persist the error placeholder, so the email is retried next scan
+        if self.cache is not None and mail.get("id") and not analysis_failed(analysis):
+            self.cache.put(mail["id"], analysis)
+
+    def analyze_all(self, emails, on_result=None):
+        """
+        Analyzes every email and returns the analyses in inbox order.
+        'on_result(index, mail, analysis)' fires on the calling thread as each one finishes.
+        """
+        results = [None] * len(emails)
+        for i, mail, analysis in self.iter_analyses(emails):
+            results[i] = analysis
+            if on_result: on_result(i, mail, analysis)
+        return results
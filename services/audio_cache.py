@@ -0,0 +1,99 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+DEFAULT_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+DEFAULT_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+
+class AudioCache:
+    """
+    Content-addressed store for synthesized PCM audio.
+    - Tier 1: in-memory LRU, bounded by total bytes
+    - Tier 2: one .pcm file per utterance under 'cache_dir', oldest files evicted past the disk cap
+    Keys are hashes of everything that changes the audio (text, voice, locale, model, sample rate).
+    """
+
+    def __init__(self, cache_dir=None, max_memory_bytes=None, max_disk_bytes=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_memory_bytes = max_memory_bytes or DEFAULT_MEMORY_BYTES
+        self.max_disk_bytes = max_disk_bytes or DEFAULT_DISK_BYTES
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, voice_id, locale, model, sample_rate):
+        raw = "\x1f".join([text, voice_id, locale, model, str(sample_rate)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the PCM bytes for 'key', or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+            os.utime(path)  # Keep recently used files away from disk eviction
+        except OSError:
+            return None  # Missing, or evicted by another thread mid-lookup: a miss either way
+        self._remember(key, pcm)
+        return pcm
+
+    def put(self, key, pcm):
+        if not pcm: return
+        self._remember(key, pcm)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Audio cache write failed: {e}")
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory: return True
+        return os.path.exists(self._path(key))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    def _remember(self, key, pcm):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = pcm
+            self._memory_bytes += len(pcm)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pcm"): continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes: break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,94 @@
+import io
+import wave
+import threading
+import numpy as np
+
+try:
+    import soundfile  # Optional: enables in-memory FLAC encoding
+except (ImportError, OSError):
+    soundfile = None
+
+
+class RingBuffer:
+    """
+    Preallocated int16 ring buffer for mic capture.
+    Memory is fixed at 'capacity' samples; once full, the oldest audio is overwritten.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._write_pos = 0
+        self._size = 0
+        self.overflowed = False
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._write_pos = 0
+            self._size = 0
+            self.overflowed = False
+
+    def write(self, samples):
+        with self._lock:
+            if self._size + len(samples) > self.capacity: self.overflowed = True
+            if len(samples) >= self.capacity:
+                self._data[:] = samples[-self.capacity:]
+                self._write_pos = 0
+                self._size = self.capacity
+                return
+
+            end = self._write_pos + len(samples)
+            if end <= self.capacity:
+                self._data[self._write_pos:end] = samples
+            else:
+                split = self.capacity - self._write_pos
+                self._data[self._write_pos:] = samples[:split]
+                self._data[:end - self.capacity] = samples[split:]
+            self._write_pos = end % self.capacity
+            self._size = min(self.capacity, self._size + len(samples))
+
+    def read(self):
+        """Returns a copy of the buffered samples, oldest first."""
+        with self._lock:
+            if self._size < self.capacity:
+                return self._data[:self._size].copy()
+            return np.concatenate([self._data[self._write_pos:], self._data[:self._write_pos]])
+
+    def __len__(self):
+        return self._size
+
+
+def resample(samples, src_rate, dst_rate=16000, taps=63):
+    """Low-pass filters (windowed sinc) then linearly resamples int16 mono audio."""
+    if src_rate == dst_rate or len(samples) == 0: return samples
+    x = samples.astype(np.float32)
+    if dst_rate < src_rate:
+        cutoff = 0.5 * dst_rate / src_rate * 0.9  # Just under the new Nyquist, normalized to src_rate
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        x = np.convolve(x, kernel / kernel.sum(), mode="same")
+    count = int(len(x) * dst_rate / src_rate)
+    positions = np.arange(count) * (src_rate / dst_rate)
+    y = np.interp(positions, np.arange(len(x)), x)
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+
+def encode_audio(samples, sample_rate, codec="flac"):
+    """
+    Encodes int16 mono audio in memory. Returns (BytesIO, codec_used).
+    FLAC needs the optional 'soundfile' package; otherwise this falls back to WAV.
+    """
+    buffer = io.BytesIO()
+    if codec == "flac" and soundfile is not None:
+        soundfile.write(buffer, samples, sample_rate, format="FLAC", subtype="PCM_16")
+        used = "flac"
+    else:
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(samples.tobytes())
+        used = "wav"
+    buffer.seek(0)
+    return buffer, used
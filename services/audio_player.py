@@ -0,0 +1,117 @@
+import time
+import queue
+import threading
+
+PA_INT16 = 8  # pyaudio.paInt16; pyaudio itself is only imported when a real device is opened
+
+
+class SimulatedStream:
+    """Output 'device' that only takes as long as the audio would to play (headless runs and benchmarks)."""
+
+    def __init__(self, sample_rate, channels):
+        self.bytes_per_second = sample_rate * channels * 2
+        self.written = 0
+
+    def write(self, pcm):
+        self.written += len(pcm)
+        time.sleep(len(pcm) / self.bytes_per_second)
+
+    def stop_stream(self): pass
+    def close(self): pass
+
+
+class AudioPlayer:
+    """
+    Owns one PyAudio output stream for the life of the app.
+    A dedicated playback thread writes queued PCM to the device, so callers never pay
+    for device setup per utterance and back-to-back clips play without gaps.
+    Audio is written in 'frame_ms' slices, so flush() silences it within one small buffer.
+    With simulate=True no sound card is opened; playback just takes real time.
+    """
+
+    def __init__(self, sample_rate=24000, channels=1, sample_format=PA_INT16, frame_ms=20, simulate=False):
+        self.simulate = simulate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frame_samples = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_bytes = self.frame_samples * channels * 2  # 16-bit samples
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="audio-player", daemon=True)
+        self._thread.start()
+
+    def play(self, pcm):
+        """Queues PCM bytes for playback and returns immediately."""
+        pcm = bytes(pcm or b"")
+        for start in range(0, len(pcm), self.frame_bytes):
+            self._queue.put(pcm[start:start + self.frame_bytes])
+
+    def flush(self):
+        """Drops all queued audio (barge-in). Pending marks are released so waiters return."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event): item.set()
+            elif callable(item): item()
+            elif item is None:
+                self._queue.put(None)  # Keep a pending close()
+                break
+
+    def mark(self):
+        """Returns an Event that is set once everything queued so far has been written to the device."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done
+
+    def call_when_played(self, fn):
+        """Calls fn() on the playback thread once everything queued so far has been written (or flushed)."""
+        self._queue.put(fn)
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued so far has played."""
+        return self.mark().wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+    # --- Playback thread ---
+    def _run(self):
+        p = None
+        stream = None
+        try:
+            if self.simulate:
+                stream = SimulatedStream(self.sample_rate, self.channels)
+            else:
+                import pyaudio
+                p = pyaudio.PyAudio()
+                stream = p.open(format=self.sample_format, channels=self.channels, rate=self.sample_rate, output=True,
+                                frames_per_buffer=self.frame_samples)
+        except Exception as e:
+            print(f"❌ Audio device error: {e}")
+
+        while True:
+            item = self._queue.get()
+            if item is None: break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            if callable(item):
+                item()
+                continue
+            if stream is None: continue  # No device: drop audio but keep honouring marks
+            try:
+                stream.write(item)
+            except Exception as e:
+                print(f"❌ Playback error: {e}")
+
+        try:
+            if stream:
+                stream.stop_stream()
+                stream.close()
+            if p: p.terminate()
+        except Exception as e:
+            print(f"Warning during audio cleanup: {e}")
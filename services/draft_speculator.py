@@ -0,0 +1,131 @@
+import os
+import heapq
+import threading
+from dotenv import load_dotenv
+from services.llm_brain import generate_email_reply
+from services.tracing import tracer
+
+load_dotenv()
+
+AUTO_DRAFT = os.getenv("AUTO_DRAFT", "0") == "1"
+
+
+class DraftJob:
+    """One speculative reply; 'text' is filled in by the worker, 'done' is set when it is final."""
+
+    def __init__(self, key, customer_name, summary, sentiment):
+        self.key = key
+        self.customer_name = customer_name
+        self.summary = summary
+        self.sentiment = sentiment
+        self.turn_id = tracer.current_turn  # The scan that queued it, not whichever turn is current when it runs
+        self.text = None
+        self.cancelled = False
+        self.started = False
+        self.done = threading.Event()
+
+
+class DraftSpeculator:
+    """
+    Pre-generates reply text for negative emails while the user is still listening to the readout.
+    - submit(): queues a job for a single low-priority worker thread (lowest 'priority' runs first)
+    - take(): returns the finished text, waits for an in-flight job, or generates a queued one inline
+    - cancel()/cancel_all(): drops jobs nobody will ask for (e.g. when a new scan starts)
+    'on_ready(job)' is called from the worker when a reply is ready (used for AUTO_DRAFT).
+    """
+
+    def __init__(self, generate_fn=generate_email_reply, on_ready=None):
+        self.generate_fn = generate_fn
+        self.on_ready = on_ready
+        self.generated = 0
+
+        self._jobs = {}
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="draft-speculator", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, customer_name, summary, sentiment, priority=0):
+        """Queues a reply for 'key' (a Gmail message id) unless one is already queued or ready."""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job and not job.cancelled: return job
+            job = DraftJob(key, customer_name, summary, sentiment)
+            self._jobs[key] = job
+            self._seq += 1
+            heapq.heappush(self._heap, (priority, self._seq, job))
+            self._cond.notify()
+            return job
+
+    def take(self, key, timeout=None):
+        """The reply for 'key', or None if nothing was speculated for it (caller generates as usual)."""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None or job.cancelled: return None
+            run_inline = not job.started
+            if run_inline: job.started = True  # The worker will skip it
+
+        if run_inline: self._generate(job)
+        job.done.wait(timeout)
+        return job.text
+
+    def cancel(self, key):
+        with self._cond:
+            job = self._jobs.pop(key, None)
+            if job: job.cancelled = True
+
+    def cancel_all(self):
+        with self._cond:
+            for job in self._jobs.values(): job.cancelled = True
+            self._jobs.clear()
+            self._heap.clear()
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap: self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancelled or job.started: continue
+                job.started = True
+            self._generate(job, turn_id=job.turn_id)
+            if self.on_ready and job.text and not job.cancelled:
+                try:
+                    self.on_ready(job)
+                except Exception as e:
+                    print(f"❌ Auto-draft Error: {e}")
+
+    def _generate(self, job, turn_id=None):
+        try:
+            with tracer.span("draft", turn_id=turn_id):
+                text = self.generate_fn(job.customer_name, job.summary, job.sentiment)
+            # A job cancelled mid-request still finishes, but its text is thrown away
+            if not job.cancelled:
+                job.text = text
+                self.generated += 1
+        except Exception as e:
+            print(f"❌ Draft Speculation Error: {e}")
+        finally:
+            job.done.set()
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    import time
+
+    def slow_reply(name, summary, sentiment):
+        time.sleep(0.3)
+        return f"Dear {name}, sorry about: {summary}"
+
+    speculator = DraftSpeculator(generate_fn=slow_reply)
+    speculator.submit("m1", "Alice", "Late delivery", "Negative")
+    speculator.submit("m2", "Bob", "Broken item", "Negative")
+    speculator.submit("m3", "Cara", "Wrong size", "Negative")
+    speculator.cancel("m3")
+
+    time.sleep(0.7)  # The user is still listening to the readout...
+    start = time.time()
+    print(speculator.take("m2"), f"({time.time() - start:.2f}s)")
+    print("Cancelled:", speculator.take("m3"), "| generated:", speculator.generated)
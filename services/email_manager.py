@@ -1,10 +1,14 @@
-import os.path
+import os
+import json
 import base64
+import threading
+from datetime import datetime, timezone
 from email.message import EmailMessage
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from dotenv import load_dotenv
+from services.tracing import tracer
+
+load_dotenv()
 
 # --- UPDATED SCOPES: Added 'gmail.compose' ---
 SCOPES = [
@@ -13,55 +17,360 @@ SCOPES = [
     "https://www.googleapis.com/auth/gmail.compose" 
 ]
 
+# --- BATCH FETCH CONFIG ---
+# Gmail allows 100 calls per batch, but recommends staying at 50 to avoid rate limiting
+BATCH_SIZE = 50
+METADATA_HEADERS = ["Subject", "From"]
+# Partial responses: only ask for the bytes we actually read
+LIST_FIELDS = "messages/id,nextPageToken"
+MESSAGE_FIELDS = "id,snippet,payload/headers"
+
+# --- INCREMENTAL SYNC CONFIG ---
+SYNC_STATE_FILE = "sync_state.json"
+HISTORY_FIELDS = "history(messagesAdded/message/id,messagesDeleted/message/id),historyId,nextPageToken"
+
+# --- STREAMING SCAN CONFIG ---
+SCAN_PAGE_SIZE = 100  # messages().list page; one page of metadata is the most a scan holds at once
+SCAN_LIST_FIELDS = "messages/id,nextPageToken,resultSizeEstimate"
+# Whole-mailbox triage: setting any of these makes the GUI stream every matching email
+# instead of looking at the newest few
+SCAN_QUERY = os.getenv("SCAN_QUERY", "")  # Gmail search syntax, e.g. "from:shop.com is:unread"
+SCAN_LABELS = [label.strip() for label in os.getenv("SCAN_LABELS", "").split(",") if label.strip()]
+SCAN_AFTER = os.getenv("SCAN_AFTER", "")  # YYYY-MM-DD
+SCAN_BEFORE = os.getenv("SCAN_BEFORE", "")
+SCAN_LIMIT = int(os.getenv("SCAN_LIMIT", "0"))  # 0 = no cap
+
+def build_search_query(query=None, after=None, before=None):
+    """Gmail 'q' string: free text/operators plus an optional date range (dates or 'YYYY-MM-DD' strings)."""
+    terms = [query] if query else []
+    for operator, day in (("after", after), ("before", before)):
+        if day: terms.append(f"{operator}:{str(day).replace('-', '/')}")
+    return " ".join(terms)
+
+# --- SHARED CLIENTS ---
+TOKEN_FILE = "token.json"
+CLIENT_SECRETS_FILE = "credentials.json"
+# The access token is refreshed in the background this long before it expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_S", "300"))
+
+def preload():
+    """Imports the Google API client and auth libraries (close to a second) ahead of the first scan."""
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    return build, Credentials, Request, InstalledAppFlow
+
+def build_service(name, version, http):
+    # Discovery documents ship with google-api-python-client: no download, no cache file
+    build = preload()[0]
+    return build(name, version, http=http, static_discovery=True, cache_discovery=False)
+
+def seconds_until(expiry):
+    now = datetime.now(timezone.utc)
+    if expiry.tzinfo is None: now = now.replace(tzinfo=None)  # google-auth keeps naive UTC datetimes
+    return (expiry - now).total_seconds()
+
+class ThreadLocalHttp:
+    """
+    httplib2.Http is not thread-safe, so one shared service object would corrupt responses
+    under concurrent workers. This hands every thread its own authorized keep-alive connection
+    behind a single object that the services can be built with.
+    """
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self._local = threading.local()
+
+    @property
+    def http(self):
+        if not hasattr(self._local, "http"):
+            import httplib2
+            import google_auth_httplib2
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=60))
+        return self._local.http
+
+    def request(self, *args, **kwargs):
+        return self.http.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+class GoogleClients:
+    """
+    One authorized Gmail/Sheets service pair for the whole process, built on first use.
+    A background thread refreshes the token shortly before it expires, so commands never
+    wait on token.json, a refresh or discovery; EmailManager() just borrows the services.
+    """
+
+    def __init__(self, token_path=TOKEN_FILE, secrets_path=CLIENT_SECRETS_FILE, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.token_path = token_path
+        self.secrets_path = secrets_path
+        self.refresh_margin = refresh_margin
+        self.creds = None
+        self.gmail = None
+        self.sheets = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def services(self):
+        """Returns (gmail, sheets); the first call authorizes (possibly via the browser) and builds them."""
+        with self._lock:
+            if self.gmail is None:
+                self.creds = self._load_credentials()
+                http = ThreadLocalHttp(self.creds)
+                self.gmail = build_service("gmail", "v1", http)
+                self.sheets = build_service("sheets", "v4", http)
+                self._start_refresher()
+            return self.gmail, self.sheets
+
+    def warm_up(self):
+        """Startup hook: builds the services if a saved token can be used without the consent screen."""
+        _, Credentials, _, _ = preload()
+        if self.gmail is not None or not os.path.exists(self.token_path): return
+        creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+        if creds.valid or creds.refresh_token: self.services()
+
+    def close(self):
+        self._stop.set()
+
+    def _load_credentials(self):
+        _, Credentials, Request, InstalledAppFlow = preload()
+        creds = None
+        if os.path.exists(self.token_path):
+            creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(self.secrets_path, SCOPES)
+                creds = flow.run_local_server(port=0)
+            self._save_token(creds)
+        return creds
+
+    def _save_token(self, creds):
+        tmp_path = f"{self.token_path}.tmp"
+        with open(tmp_path, "w") as token:
+            token.write(creds.to_json())
+        os.replace(tmp_path, self.token_path)
+
+    # --- Proactive refresh ---
+    def _start_refresher(self):
+        if self._refresher or not self.creds.refresh_token: return
+        self._refresher = threading.Thread(target=self._refresh_loop, name="google-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        Request = preload()[2]
+        while not self._stop.is_set():
+            expiry = self.creds.expiry
+            wait = 60.0 if expiry is None else seconds_until(expiry) - self.refresh_margin
+            if wait > 0:
+                # Re-check at least every few minutes (the machine may have slept)
+                self._stop.wait(min(wait, 300.0))
+                continue
+            try:
+                self.creds.refresh(Request())
+                self._save_token(self.creds)
+                self.refreshes += 1
+            except Exception as e:
+                print(f"❌ Google token refresh error: {e}")
+                self._stop.wait(60.0)
+
+# Shared by every EmailManager, so commands reuse one authorized connection set
+google_clients = GoogleClients()
+
 class EmailManager:
-    def __init__(self):
+    def __init__(self, http=None, clients=None, sync_state_path=SYNC_STATE_FILE):
+        self.clients = clients or google_clients
+        self.sync_state_path = sync_state_path
         self.creds = None
         self.service_gmail = None
         self.service_sheets = None
-        self.authenticate()
+        self.last_sync_added = []
+        self.scanned = 0
+        self.scan_estimate = None
+        if http is not None:
+            # Offline mode (e.g. services.fake_google.FakeGoogleHttp): skip OAuth entirely
+            self.service_gmail = build_service("gmail", "v1", http)
+            self.service_sheets = build_service("sheets", "v4", http)
+        else:
+            self.authenticate()
 
     def authenticate(self):
-        if os.path.exists("token.json"):
-            self.creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                self.creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-                self.creds = flow.run_local_server(port=0)
-            with open("token.json", "w") as token:
-                token.write(self.creds.to_json())
-
-        self.service_gmail = build("gmail", "v1", credentials=self.creds)
-        self.service_sheets = build("sheets", "v4", credentials=self.creds)
+        self.service_gmail, self.service_sheets = self.clients.services()
+        self.creds = self.clients.creds
 
     def fetch_recent_emails(self, count=5):
-        # (Keep your existing fetch code exactly as it was)
-        results = self.service_gmail.users().messages().list(userId="me", maxResults=count).execute()
+        results = self.service_gmail.users().messages().list(userId="me", maxResults=count, fields=LIST_FIELDS).execute()
         messages = results.get("messages", [])
-        email_data = []
         if not messages: return []
-        
-        for message in messages:
-            msg = self.service_gmail.users().messages().get(userId="me", id=message["id"]).execute()
-            payload = msg["payload"]
-            headers = payload.get("headers", [])
-            subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-            sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown")
-            snippet = msg.get("snippet", "")
-            email_data.append({"id": message["id"], "subject": subject, "sender": sender, "snippet": snippet})
-        return email_data
+        return self.fetch_email_metadata([message["id"] for message in messages])
+
+    def scan_emails(self, query=None, label_ids=None, after=None, before=None, limit=None, page_size=SCAN_PAGE_SIZE):
+        """
+        Generator over every email matching the filters, newest first.
+        Pages through messages().list with nextPageToken and fetches metadata one page at a time,
+        so memory stays flat however large the mailbox is. Stops after 'limit' emails if given.
+        Progress is kept in 'self.scanned' and 'self.scan_estimate' (Gmail's resultSizeEstimate).
+        """
+        q = build_search_query(query, after, before)
+        self.scanned = 0
+        self.scan_estimate = None
+        page_token = None
+        while limit is None or self.scanned < limit:
+            with tracer.span("gmail_fetch", page=True) as span:
+                response = self.service_gmail.users().messages().list(
+                    userId="me", q=q or None, labelIds=label_ids or None, pageToken=page_token,
+                    maxResults=page_size if limit is None else min(page_size, limit - self.scanned),
+                    fields=SCAN_LIST_FIELDS
+                ).execute()
+                ids = [message["id"] for message in response.get("messages", [])]
+                emails = self.fetch_email_metadata(ids) if ids else []
+                span["count"] = len(emails)
+            if self.scan_estimate is None: self.scan_estimate = response.get("resultSizeEstimate")
+            for mail in emails:
+                self.scanned += 1
+                yield mail
+            page_token = response.get("nextPageToken")
+            if not page_token: return
+
+    def sync_recent_emails(self, count=5, state_path=None):
+        """
+        Incremental version of fetch_recent_emails().
+        The newest 'count' emails and the mailbox historyId are persisted in 'state_path'
+        (default: the manager's sync_state_path);
+        later calls ask users().history().list for what changed since then and only fetch
+        the newly added messages. Falls back to a full resync when the historyId has expired.
+        IDs of the emails that are new since the last sync end up in 'self.last_sync_added'.
+        """
+        with tracer.span("gmail_fetch", count=count) as span:
+            emails = self._sync(count, state_path or self.sync_state_path)
+            span["new"] = len(self.last_sync_added)
+            return emails
+
+    def _sync(self, count, state_path):
+        state = self._load_sync_state(state_path)
+        if not state or state.get("count") != count:
+            return self._full_sync(count, state_path)
 
-    def log_to_sheet(self, data):
-        # (Keep your existing sheet code)
-        spreadsheet_id = os.getenv("SPREADSHEET_ID")
-        values = [[data.customer_name, data.order_id, data.category, data.sentiment, data.summary]]
-        body = {'values': values}
         try:
-            self.service_sheets.spreadsheets().values().append(
-                spreadsheetId=spreadsheet_id, range="Sheet1!A:E", valueInputOption="USER_ENTERED", body=body
+            added, removed, history_id = self._read_history(state["history_id"])
+        except HttpError as e:
+            if e.resp.status == 404:
+                print("Gmail history expired, running a full resync...")
+                return self._full_sync(count, state_path)
+            raise
+
+        window = [mail for mail in state["emails"] if mail["id"] not in removed]
+        if removed and len(window) < count:
+            # Something left the window; refill it from scratch rather than guess what slid in
+            return self._full_sync(count, state_path)
+
+        known = {mail["id"] for mail in window}
+        new_ids = [message_id for message_id in dict.fromkeys(added) if message_id not in known and message_id not in removed]
+        new_emails = self.fetch_email_metadata(new_ids) if new_ids else []
+
+        emails = (new_emails + window)[:count]
+        self.last_sync_added = [mail["id"] for mail in new_emails]
+        self._save_sync_state(state_path, {"history_id": history_id, "count": count, "emails": emails})
+        return emails
+
+    def _full_sync(self, count, state_path):
+        # Read the historyId first so nothing that arrives during the listing is missed next time
+        history_id = self.service_gmail.users().getProfile(userId="me", fields="historyId").execute()["historyId"]
+        emails = self.fetch_recent_emails(count=count)
+        self.last_sync_added = [mail["id"] for mail in emails]
+        self._save_sync_state(state_path, {"history_id": history_id, "count": count, "emails": emails})
+        return emails
+
+    def _read_history(self, start_history_id):
+        """Returns (added ids newest first, removed ids, latest historyId) since 'start_history_id'."""
+        added, removed = [], set()
+        history_id = start_history_id
+        page_token = None
+        while True:
+            response = self.service_gmail.users().history().list(
+                userId="me", startHistoryId=start_history_id, pageToken=page_token,
+                historyTypes=["messageAdded", "messageDeleted"], fields=HISTORY_FIELDS
             ).execute()
+            for record in response.get("history", []):
+                added.extend(item["message"]["id"] for item in record.get("messagesAdded", []))
+                removed.update(item["message"]["id"] for item in record.get("messagesDeleted", []))
+            history_id = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token: break
+        # History is reported oldest first; the inbox view wants newest first
+        added.reverse()
+        return added, removed, history_id
+
+    def _load_sync_state(self, state_path):
+        if not os.path.exists(state_path): return None
+        try:
+            with open(state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Sync state unreadable, resyncing: {e}")
+            return None
+
+    def _save_sync_state(self, state_path, state):
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def fetch_email_metadata(self, message_ids):
+        """
+        Fetches Subject/From/snippet for many messages in one HTTP round-trip per BATCH_SIZE ids.
+        Results keep the order of 'message_ids'; messages that fail to load are skipped.
+        """
+        found = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Gmail Batch Error ({request_id}): {exception}")
+                return
+            found[request_id] = self._parse_message(response)
+
+        for start in range(0, len(message_ids), BATCH_SIZE):
+            batch = self.service_gmail.new_batch_http_request(callback=on_response)
+            for message_id in message_ids[start:start + BATCH_SIZE]:
+                batch.add(
+                    self.service_gmail.users().messages().get(
+                        userId="me", id=message_id, format="metadata",
+                        metadataHeaders=METADATA_HEADERS, fields=MESSAGE_FIELDS
+                    ),
+                    request_id=message_id
+                )
+            batch.execute()
+
+        return [found[message_id] for message_id in message_ids if message_id in found]
+
+    def _parse_message(self, msg):
+        headers = msg.get("payload", {}).get("headers", [])
+        subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
+        sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown")
+        snippet = msg.get("snippet", "")
+        return {"id": msg["id"], "subject": subject, "sender": sender, "snippet": snippet}
+
+    def analysis_to_row(self, data):
+        return [data.customer_name, data.order_id, data.category, data.sentiment, data.summary]
+
+    def append_rows(self, rows):
+        """Appends many rows in a single Sheets call. Raises on failure so callers can retry."""
+        spreadsheet_id = os.getenv("SPREADSHEET_ID")
+        body = {'values': rows}
+        return self.service_sheets.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id, range="Sheet1!A:E", valueInputOption="USER_ENTERED", body=body
+        ).execute()
+
+    def log_to_sheet(self, data):
+        # One-off synchronous write; bulk scans should go through services.sheet_writer.SheetWriter
+        try:
+            self.append_rows([self.analysis_to_row(data)])
         except Exception as e:
             print(f"Sheet Error: {e}")
 
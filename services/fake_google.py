@@ -0,0 +1,166 @@
+import json
+import re
+import time
+import random
+import threading
+from email import message_from_string
+from urllib.parse import urlparse, parse_qs
+import httplib2
+
+# A tiny canned inbox so the app can be exercised without a Google account
+SAMPLE_MESSAGES = [
+    {"id": "18c0a1", "subject": "Package arrived crushed", "sender": "Sarah Connor <sarah@example.com>",
+     "snippet": "Hi, I received my order #998877 yesterday, but the package was crushed. Please refund me."},
+    {"id": "18c0a2", "subject": "Love the new headphones", "sender": "John Smith <john@example.com>",
+     "snippet": "Just wanted to say the sound quality is amazing. Great job team!"},
+    {"id": "18c0a3", "subject": "Where is my order?", "sender": "Priya Patel <priya@example.com>",
+     "snippet": "Order #556677 was supposed to arrive last week. Tracking has not updated in 5 days."},
+    {"id": "18c0a4", "subject": "Question about warranty", "sender": "Alex Kim <alex@example.com>",
+     "snippet": "Does the 1 year warranty cover water damage? Thanks."},
+]
+
+
+class FakeGoogleHttp:
+    """
+    Offline stand-in for httplib2.Http that speaks just enough of the Gmail and Sheets REST APIs.
+    Pass it to EmailManager(http=...) to run fetches (including batch requests)
+    without network access. Every request is recorded in 'calls' so round-trips can be counted.
+    """
+
+    def __init__(self, messages=None, latency=0.0, jitter=0.0):
+        self.messages = {m["id"]: m for m in (messages or SAMPLE_MESSAGES)}
+        self.order = [m["id"] for m in (messages or SAMPLE_MESSAGES)]
+        self.latency = latency
+        self.jitter = jitter  # Extra random delay of up to 'jitter' seconds per round-trip
+        self.calls = []
+        self.sheet_rows = []
+        self._lock = threading.Lock()
+
+        # Mailbox history, so incremental sync can be exercised
+        self.history_id = 1000
+        self.oldest_history_id = 1000
+        self.history = []
+
+    # --- Simulating mailbox changes ---
+    def add_message(self, message):
+        """Delivers a new message to the top of the inbox."""
+        with self._lock:
+            self.messages[message["id"]] = message
+            self.order.insert(0, message["id"])
+            self.history_id += 1
+            self.history.append({"id": str(self.history_id), "messagesAdded": [{"message": {"id": message["id"]}}]})
+
+    def delete_message(self, message_id):
+        with self._lock:
+            self.messages.pop(message_id, None)
+            if message_id in self.order: self.order.remove(message_id)
+            self.history_id += 1
+            self.history.append({"id": str(self.history_id), "messagesDeleted": [{"message": {"id": message_id}}]})
+
+    def expire_history(self):
+        """Makes every previously issued historyId invalid (Gmail answers 404)."""
+        with self._lock:
+            self.history = []
+            self.oldest_history_id = self.history_id + 1
+
+    # --- httplib2.Http interface ---
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        with self._lock:
+            self.calls.append((method, uri))
+        if self.latency or self.jitter: time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        path = urlparse(uri).path
+        if path == "/batch" or path.startswith("/batch/"):
+            return self._handle_batch(body, headers or {})
+        status, payload = self._route(method, uri, body)
+        return self._json_response(status, payload)
+
+    # --- Routing ---
+    def _route(self, method, uri, body):
+        parsed = urlparse(uri)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+
+        if method == "GET" and re.fullmatch(r"/gmail/v1/users/me/messages", path):
+            limit = int(query.get("maxResults", ["100"])[0])
+            offset = int(query.get("pageToken", ["0"])[0])
+            matching = [i for i in self.order if self._matches(self.messages[i], query.get("q", [""])[0], query.get("labelIds", []))]
+            page = {"messages": [{"id": i, "threadId": i} for i in matching[offset:offset + limit]], "resultSizeEstimate": len(matching)}
+            if offset + limit < len(matching): page["nextPageToken"] = str(offset + limit)
+            return 200, page
+
+        if method == "GET" and path == "/gmail/v1/users/me/profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": str(self.history_id)}
+
+        if method == "GET" and path == "/gmail/v1/users/me/history":
+            start = int(query["startHistoryId"][0])
+            if start < self.oldest_history_id:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            records = [record for record in self.history if int(record["id"]) > start]
+            return 200, {"history": records, "historyId": str(self.history_id)}
+
+        match = re.fullmatch(r"/gmail/v1/users/me/messages/([^/]+)", path)
+        if method == "GET" and match:
+            message = self.messages.get(match.group(1))
+            if not message: return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, self._message_resource(message, query.get("metadataHeaders"))
+
+        match = re.fullmatch(r"/v4/spreadsheets/([^/]+)/values/([^/]+):append", path)
+        if method == "POST" and match:
+            rows = json.loads(body or "{}").get("values", [])
+            with self._lock:
+                self.sheet_rows.extend(rows)
+            return 200, {"spreadsheetId": match.group(1), "updates": {"updatedRows": len(rows)}}
+
+        return 404, {"error": {"code": 404, "message": f"No fake route for {method} {path}"}}
+
+    @staticmethod
+    def _matches(message, q, label_ids):
+        """Rough Gmail search: every plain word of 'q' must appear somewhere; operators (after:, is:, ...) are ignored."""
+        if label_ids and not set(label_ids) & set(message.get("labels", ["INBOX"])): return False
+        text = f"{message['subject']} {message['sender']} {message['snippet']}".lower()
+        return all(word in text for word in q.lower().split() if ":" not in word)
+
+    def _message_resource(self, message, metadata_headers=None):
+        headers = [{"name": "Subject", "value": message["subject"]}, {"name": "From", "value": message["sender"]}]
+        if metadata_headers:
+            headers = [h for h in headers if h["name"] in metadata_headers]
+        return {"id": message["id"], "threadId": message["id"], "snippet": message["snippet"], "payload": {"headers": headers}}
+
+    # --- Batch endpoint (multipart/mixed in, multipart/mixed out) ---
+    def _handle_batch(self, body, headers):
+        content_type = headers.get("content-type") or headers.get("Content-Type")
+        if isinstance(body, bytes): body = body.decode("utf-8")
+        envelope = message_from_string(f"content-type: {content_type}\r\n\r\n{body}")
+
+        boundary = "fake_batch_boundary"
+        parts = []
+        for part in envelope.get_payload():
+            request_line = part.get_payload().splitlines()[0]
+            method, target, _ = request_line.split(" ", 2)
+            status, payload = self._route(method, f"https://fake.googleapis.com{target}", None)
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        content = "".join(parts) + f"--{boundary}--\r\n"
+        response = httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={boundary}"})
+        return response, content.encode("utf-8")
+
+    def _json_response(self, status, payload):
+        response = httplib2.Response({"status": status, "content-type": "application/json; charset=UTF-8"})
+        return response, json.dumps(payload).encode("utf-8")
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    from services.email_manager import EmailManager
+
+    http = FakeGoogleHttp()
+    bot = EmailManager(http=http)
+    emails = bot.fetch_recent_emails(count=4)
+    for mail in emails:
+        print(f"{mail['id']}: {mail['subject']} ({mail['sender']})")
+    print(f"\nHTTP round-trips: {len(http.calls)}")
@@ -0,0 +1,75 @@
+import json
+import threading
+from websockets.sync.server import serve
+
+
+class FakeStreamingServer:
+    """
+    Local websocket stand-in for AssemblyAI Universal Streaming (v3).
+    Reveals 'transcript' word by word as audio arrives (partial Turn messages) and sends the
+    formatted final turn when the client asks for ForceEndpoint/Terminate.
+    Point the backend at it with AssemblyAIStreamingBackend(url=server.url).
+    """
+
+    def __init__(self, transcript="start analysis", bytes_per_word=8820, host="127.0.0.1", port=0):
+        self.transcript = transcript
+        self.bytes_per_word = bytes_per_word  # ~0.1 s of 44.1 kHz int16 audio per revealed word
+        self.audio_bytes_received = 0
+        self._server = serve(self._handle, host, port)
+        self.url = f"ws://{host}:{self._server.socket.getsockname()[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-stt", daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def _handle(self, websocket):
+        words = self.transcript.split()
+        received = 0
+        finalized = False
+        websocket.send(json.dumps({"type": "Begin", "id": "fake-session"}))
+
+        for message in websocket:
+            if isinstance(message, bytes):
+                received += len(message)
+                self.audio_bytes_received += len(message)
+                shown = min(len(words), received // self.bytes_per_word)
+                if shown:
+                    websocket.send(json.dumps({
+                        "type": "Turn", "turn_order": 0, "end_of_turn": False, "turn_is_formatted": False,
+                        "transcript": " ".join(words[:shown]).lower()
+                    }))
+                continue
+
+            kind = json.loads(message).get("type")
+            if kind in ("ForceEndpoint", "Terminate") and not finalized:
+                finalized = True
+                websocket.send(json.dumps({
+                    "type": "Turn", "turn_order": 0, "end_of_turn": True, "turn_is_formatted": True,
+                    "transcript": self.transcript[:1].upper() + self.transcript[1:] + "."
+                }))
+            if kind == "Terminate":
+                websocket.send(json.dumps({"type": "Termination", "audio_duration_seconds": 0}))
+                break
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    from services.streaming_stt import AssemblyAIStreamingBackend
+
+    with FakeStreamingServer(transcript="explain email four in hindi") as server:
+        backend = AssemblyAIStreamingBackend(api_key="fake", url=server.url)
+        backend.start(44100, on_partial=lambda text: print(f"  partial: {text}"))
+        for _ in range(50):
+            backend.send_audio(bytes(2048))
+        print(f"Final: {backend.finish()}")
@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Quotas of the Gemini project/tier (requests and tokens per minute)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "1000"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+# Upper bound for requests in flight; the AIMD controller works below it
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Responses slower than this count as congestion (a gentle back-off)
+GEMINI_TARGET_LATENCY = float(os.getenv("GEMINI_TARGET_LATENCY_S", "15"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "5"))
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) for budgeting requests."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Refills 'rate_per_minute' units per minute up to 'capacity'; acquire() blocks until enough are available."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.available = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)  # A single huge request must still get through eventually
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on requests in flight.
+    - success: limit grows by about one per 'limit' completions (additive increase), only while the
+      window is full and not within a cooldown of the last decrease
+    - 429: limit halves (multiplicative decrease), at most once per cooldown so one burst counts once
+    - slow response: limit shrinks by 10%
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=GEMINI_MAX_CONCURRENCY, target_latency=GEMINI_TARGET_LATENCY, cooldown=2.0):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit): self._cond.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency):
+        with self._cond:
+            if latency > self.target_latency:
+                self._decrease(0.9)
+            elif self.in_flight >= int(self.limit) and time.monotonic() - self._last_decrease >= self.cooldown:
+                # Only grow while the limit is what holds requests back, and not right after a back-off
+                # ('in_flight' still counts this request, so a full window means in_flight == limit)
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.throttled += 1
+            self._decrease(0.5)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown: return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+
+def is_retryable(error):
+    import httpx
+    from google.genai import errors
+    if isinstance(error, errors.APIError): return error.code in RETRYABLE_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class GeminiClient:
+    """
+    Process-wide Gemini client: every generate_content call passes an RPM bucket, a TPM bucket
+    and the AIMD concurrency limit, and 429/5xx/network errors are retried with jittered
+    exponential back-off (tenacity). google.genai (over a second to import) and the client
+    itself are only loaded on first use, or by warm_up() in the background.
+    """
+
+    def __init__(self, api_key=None, rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_attempts=GEMINI_MAX_ATTEMPTS):
+        self.api_key = api_key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency()
+        self.max_attempts = max_attempts
+        self.retries = 0
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from google import genai
+                    self._client = genai.Client(api_key=self.api_key or os.getenv("GEMINI_API_KEY"))
+        return self._client
+
+    def warm_up(self):
+        """Imports google.genai and builds the client ahead of the first request."""
+        return self.client
+
+    def generate_content(self, model, contents, config=None, output_tokens=256):
+        """Same arguments as client.models.generate_content; 'output_tokens' sizes the TPM reservation."""
+        cost = estimate_tokens(contents if isinstance(contents, str) else str(contents)) + output_tokens
+        retrying = Retrying(
+            retry=retry_if_exception(is_retryable),
+            wait=wait_random_exponential(multiplier=1, max=30),
+            stop=stop_after_attempt(self.max_attempts),
+            before_sleep=self._before_retry,
+            reraise=True,
+        )
+        for attempt in retrying:
+            with attempt:
+                return self._call(model, contents, config, cost)
+
+    def _call(self, model, contents, config, cost):
+        from google.genai import errors
+        self.requests.acquire(1)
+        self.tokens.acquire(cost)
+        with self.concurrency:
+            started = time.monotonic()
+            try:
+                response = self.client.models.generate_content(model=model, contents=contents, config=config)
+            except errors.APIError as e:
+                if e.code == 429: self.concurrency.on_throttle()
+                raise
+            self.concurrency.on_success(time.monotonic() - started)
+            return response
+
+    def _before_retry(self, state):
+        self.retries += 1
+        print(f"⏳ Gemini retry {state.attempt_number}/{self.max_attempts}: {state.outcome.exception()}")
+
+
+# Shared by llm_brain and intent_router, so both draw from the same quota
+gemini = GeminiClient()
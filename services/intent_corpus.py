@@ -0,0 +1,92 @@
+from services.intent_router import classify_locally, FAST_INTENT_THRESHOLD
+
+# Labelled voice commands: (transcript, action, keywords, language)
+# Keywords are compared case-insensitively; 'none' means no target.
+LABELLED_COMMANDS = [
+    ("Start analysis.", "ANALYZE_NEW", "none", "en"),
+    ("Start the analysis", "ANALYZE_NEW", "none", "en"),
+    ("Check my inbox", "ANALYZE_NEW", "none", "en"),
+    ("Scan the emails please", "ANALYZE_NEW", "none", "en"),
+    ("Scan in Hindi", "ANALYZE_NEW", "none", "hi"),
+    ("Analyze my emails in Hindi", "ANALYZE_NEW", "none", "hi"),
+    ("Begin scanning.", "ANALYZE_NEW", "none", "en"),
+    ("Stats", "GET_SENTIMENT_STATS", "none", "en"),
+    ("How is the mood today?", "GET_SENTIMENT_STATS", "none", "en"),
+    ("Give me the sentiment report", "GET_SENTIMENT_STATS", "none", "en"),
+    ("Show me the statistics", "GET_SENTIMENT_STATS", "none", "en"),
+    ("Explain email 4", "SUMMARIZE_SPECIFIC", "4", "en"),
+    ("Explain email four.", "SUMMARIZE_SPECIFIC", "4", "en"),
+    ("Read number 2", "SUMMARIZE_SPECIFIC", "2", "en"),
+    ("Explain email 2 in Hindi", "SUMMARIZE_SPECIFIC", "2", "hi"),
+    ("Tell me about the third email", "SUMMARIZE_SPECIFIC", "3", "en"),
+    ("Explain the email from Sarah", "SUMMARIZE_SPECIFIC", "Sarah", "en"),
+    ("Explain the one from Sarah", "SUMMARIZE_SPECIFIC", "Sarah", "en"),
+    ("Read email number one", "SUMMARIZE_SPECIFIC", "1", "en"),
+    ("Summarize email #5", "SUMMARIZE_SPECIFIC", "5", "en"),
+    ("Draft reply to 3", "DRAFT_REPLY", "3", "en"),
+    ("Draft a reply to email #3", "DRAFT_REPLY", "3", "en"),
+    ("Write a response to email two", "DRAFT_REPLY", "2", "en"),
+    ("Reply to Sarah", "DRAFT_REPLY", "Sarah", "en"),
+    ("Write an email to Sarah", "DRAFT_REPLY", "Sarah", "en"),
+    ("Compose an answer for number six", "DRAFT_REPLY", "6", "en"),
+    ("Show delivery emails", "FILTER_BY_CATEGORY", "delivery", "en"),
+    ("Show me only refund complaints", "FILTER_BY_CATEGORY", "refund", "en"),
+    ("Filter by product", "FILTER_BY_CATEGORY", "product", "en"),
+    ("List the spam", "FILTER_BY_CATEGORY", "spam", "en"),
+    ("Stop", "EXIT", "none", "en"),
+    ("Exit.", "EXIT", "none", "en"),
+    ("Quit the app", "EXIT", "none", "en"),
+    ("Goodbye", "EXIT", "none", "en"),
+    # Ambiguous or open-ended: these should be left to Gemini
+    ("What should I do about the angry customer?", "UNKNOWN", "none", "en"),
+    ("Can you help me with something", "UNKNOWN", "none", "en"),
+    # Adversarial: homophones, the pronoun "one" and pronoun/quantifier "names" must not be resolved confidently
+    ("Read email for", "UNKNOWN", "none", "en"),
+    ("Do you read email for me", "UNKNOWN", "none", "en"),
+    ("Write an email to them", "UNKNOWN", "none", "en"),
+    ("Reply to everyone", "UNKNOWN", "none", "en"),
+    ("Draft a reply for me", "UNKNOWN", "none", "en"),
+    ("Tell me about this one", "UNKNOWN", "none", "en"),
+    ("Explain that one in Hindi", "UNKNOWN", "none", "hi"),
+    ("Is anyone upset about shipping times", "UNKNOWN", "none", "en"),
+    ("Stop reading and draft a reply", "UNKNOWN", "none", "en"),
+]
+
+
+def evaluate(corpus=LABELLED_COMMANDS, verbose=True):
+    """
+    Runs the local classifier over the corpus.
+    - hit rate: share of commands resolved locally (confidence >= threshold)
+    - accuracy: share of those local answers that match the label exactly
+    Labels of 'UNKNOWN' mean the command should NOT be resolved locally.
+    """
+    hits, correct, wrong_fallbacks = 0, 0, 0
+    resolvable = sum(1 for _, action, _, _ in corpus if action != "UNKNOWN")
+    for text, action, keywords, language in corpus:
+        intent = classify_locally(text)
+        resolved = intent is not None and intent.confidence >= FAST_INTENT_THRESHOLD
+        if not resolved:
+            if action != "UNKNOWN":
+                wrong_fallbacks += 1
+                if verbose: print(f"  -> Gemini: {text!r}")
+            continue
+        hits += 1
+        ok = (intent.action, intent.keywords.lower(), intent.language) == (action, keywords.lower(), language)
+        correct += ok
+        if verbose and not ok:
+            print(f"  ✗ {text!r}: got {intent.action}/{intent.keywords}/{intent.language}, want {action}/{keywords}/{language}")
+
+    report = {
+        "commands": len(corpus),
+        "hit_rate": hits / len(corpus) if corpus else 0.0,
+        "coverage": (resolvable - wrong_fallbacks) / resolvable if resolvable else 0.0,
+        "accuracy": correct / hits if hits else 0.0,
+    }
+    if verbose:
+        print(f"Hit rate: {report['hit_rate']:.0%} | Coverage of resolvable: {report['coverage']:.0%} | Accuracy: {report['accuracy']:.0%}")
+    return report
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    evaluate()
@@ -1,19 +1,121 @@
 import os
-from google import genai
+import re
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from services.tracing import tracer
+from services.gemini_client import gemini
 
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 class UserIntent(BaseModel):
     # CHANGED: 'SUMMARIZE_HINDI' -> 'SUMMARIZE_SPECIFIC'
     action: str = Field(description="Action: 'ANALYZE_NEW', 'GET_SENTIMENT_STATS', 'SUMMARIZE_SPECIFIC', 'FILTER_BY_CATEGORY', 'DRAFT_REPLY', 'EXIT', 'UNKNOWN'")
     keywords: str = Field(description="Specific targets (e.g., 'delivery', 'email 4', 'Sarah'). If none, use 'none'.")
     language: str = Field(description="Language requested: 'en' for English, 'hi' for Hindi. Default to 'en'.")
+    confidence: float = Field(default=1.0, description="How sure you are about the action, from 0.0 to 1.0.")
+
+# --- LOCAL FAST PATH ---
+# Trivial commands ("stop", "stats", "explain email 4") are resolved here without a Gemini round-trip.
+# Anything below FAST_INTENT_THRESHOLD is treated as ambiguous and goes to the LLM.
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", "0.8"))
+
+NUMBER_WORDS = {
+    'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'eleven': 11, 'twelve': 12, 'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6,
+}
+# "one" is usually a pronoun ("the one from Sarah"); only trusted alone (a Gemini keyword) or right after "email"/"number"
+ONE_PATTERN = r'^one$|\b(?:email|mail|number|no)\s+one\b'
+# Homophones ASR loves; only trusted as the last word after "email"/"number" ("read email for"),
+# never before a name ("email to Sarah"), and never confident enough to skip Gemini
+HOMOPHONES = {'to': 2, 'too': 2, 'for': 4}
+HOMOPHONE_PATTERN = r'\b(?:email|mail|number|no)\s+(to|too|for)(?:\s+(?:in hindi|please))?$'
+# Words after "to"/"from"/"for" that are not customer names
+NOT_NAMES = {'email', 'mail', 'reply', 'hindi', 'english', 'me', 'you', 'us', 'him', 'her', 'them', 'it', 'this', 'that',
+             'everyone', 'everybody', 'anyone', 'someone', 'all', 'both', 'each', 'customer', 'customers'}
+CATEGORIES = ['delivery', 'product', 'refund', 'general', 'spam']
+
+def parse_number_word(text):
+    """Finds an email number in text: digits, '#3', or number words ('four', 'third')."""
+    return _find_number(text)[0]
+
+def _find_number(text):
+    """(number or None, True if it was only a homophone guess)."""
+    text = text.lower()
+    digits = re.findall(r'\d+', text)
+    if digits: return int(digits[0]), False
+    for word in re.findall(r"[a-z]+", text):
+        if word in NUMBER_WORDS: return NUMBER_WORDS[word], False
+    if re.search(ONE_PATTERN, text): return 1, False
+    # "email for" / "number to" -> 4 / 2
+    match = re.search(HOMOPHONE_PATTERN, text)
+    if match: return HOMOPHONES[match.group(1)], True
+    return None, False
+
+def _normalize(text):
+    text = text.lower().replace("#", " number ")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def _target(text):
+    """Email number or a customer name following 'to'/'from'/'about'."""
+    number, guessed = _find_number(text)
+    # A homophone guess ("email for" -> 4) is left for Gemini to confirm
+    if number: return str(number), 0.6 if guessed else 0.95
+    match = re.search(r"\b(?:to|from|about|for)\s+([a-z]+)$", text)
+    if match and match.group(1) not in NOT_NAMES:
+        return match.group(1).capitalize(), 0.85
+    return "none", 0.5
+
+def classify_locally(user_text):
+    """
+    Deterministic keyword/regex grammar for common commands.
+    Returns a UserIntent with a confidence score, or None when nothing matched.
+    """
+    text = _normalize(user_text or "")
+    if not text: return None
+    language = "hi" if re.search(r"\bhindi\b", text) else "en"
+    candidates = []
+
+    if re.fullmatch(r"(please )?(stop|exit|quit|goodbye|bye|shut down|shutdown)( now| please| the app| the agent)?", text):
+        candidates.append(("EXIT", "none", 0.95))
+    if re.search(r"\b(stats|statistics|mood|sentiment (report|stats|breakdown))\b", text):
+        candidates.append(("GET_SENTIMENT_STATS", "none", 0.9))
+    if re.search(r"\b(draft|compose|write)\b.*\b(reply|response|answer|email)\b|\breply to\b", text):
+        keywords, confidence = _target(text)
+        candidates.append(("DRAFT_REPLY", keywords, confidence))
+    if re.search(r"\b(explain|read|summari[sz]e|describe|tell me about|details (of|on|for)|what about)\b", text) \
+            and not re.search(r"\b(inbox|emails|all)\b", text):
+        keywords, confidence = _target(text)
+        candidates.append(("SUMMARIZE_SPECIFIC", keywords, confidence))
+    category = next((c for c in CATEGORIES if re.search(rf"\b{c}\b", text)), None)
+    if category and re.search(r"\b(show|filter|only|list|find|give)\b", text):
+        candidates.append(("FILTER_BY_CATEGORY", category, 0.9))
+    if re.search(r"\b(start|begin|run|do)\b.*\b(analysis|analyzing|scan|scanning)\b", text) \
+            or re.search(r"\b(scan|check|analy[sz]e|refresh)\b.*\b(inbox|emails|mail|mailbox)\b", text) \
+            or re.fullmatch(r"(start|scan|analy[sz]e|begin)( now| please)?( in hindi)?", text):
+        candidates.append(("ANALYZE_NEW", "none", 0.9))
+
+    if not candidates: return None
+    candidates.sort(key=lambda c: c[2], reverse=True)
+    action, keywords, confidence = candidates[0]
+    # Two different strong readings of one sentence: let Gemini decide
+    if len(candidates) > 1 and candidates[1][2] >= FAST_INTENT_THRESHOLD: confidence = min(confidence, 0.6)
+    return UserIntent(action=action, keywords=keywords, language=language, confidence=confidence)
 
 def determine_intent(user_text):
+    with tracer.span("intent") as span:
+        intent = _determine_intent(user_text)
+        span["action"] = intent.action
+        span["confidence"] = intent.confidence
+        return intent
+
+
+def _determine_intent(user_text):
+    local = classify_locally(user_text)
+    if local and local.confidence >= FAST_INTENT_THRESHOLD:
+        return local
+
     try:
         prompt = f"""
         You are the Brain of a Voice Agent. Extract Action, Keywords, and Language.
@@ -39,7 +141,7 @@ def determine_intent(user_text):
         User Command: "{user_text}"
         """
 
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model="gemini-2.5-flash",
             contents=prompt,
             config={"response_mime_type": "application/json", "response_schema": UserIntent}
@@ -49,4 +151,6 @@ def determine_intent(user_text):
 
     except Exception as e:
         print(f"Router Error: {e}")
-        return UserIntent(action="UNKNOWN", keywords="none", language="en")
\ No newline at end of file
+        # A low-confidence local guess still beats "I didn't understand"
+        if local: return local
+        return UserIntent(action="UNKNOWN", keywords="none", language="en", confidence=0.0)
\ No newline at end of file
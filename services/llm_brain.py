@@ -1,13 +1,14 @@
 import os
-from google import genai
+import json
+import hashlib
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from services.gemini_client import gemini, estimate_tokens
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API (New SDK)
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Gemini calls go through the shared rate-limited client (services/gemini_client.py)
 
 # --- 1. Define the "Form" (MERGED: Old + New Fields) ---
 class EmailAnalysis(BaseModel):
@@ -23,13 +24,8 @@ class EmailAnalysis(BaseModel):
     recommendation: str = Field(description="The next best action (e.g., 'Offer discount', 'Check tracking', 'Reply').")
 
 # --- 2. The Brain Function ---
-def analyze_email(email_text):
-    """
-    Sends email text to Gemini and returns a structured EmailAnalysis object.
-    """
-    try:
-        # We use standard 2.5 Flash (Most reliable for Hackathons)
-        prompt = f"""
+ANALYSIS_MODEL = "gemini-2.5-flash"
+ANALYSIS_PROMPT = """
         You are an elite Customer Experience AI. 
         Analyze the following customer email. 
         Identify the core Details, the Emotional Tone, and suggest a Next Best Action.
@@ -38,9 +34,61 @@ def analyze_email(email_text):
         "{email_text}"
         """
 
+# --- 2b. Batch Form: many emails, one request ---
+class EmailAnalysisItem(EmailAnalysis):
+    email_id: str = Field(description="The ID shown above the email, copied exactly (e.g. 'E3').")
+
+class EmailAnalysisBatch(BaseModel):
+    results: list[EmailAnalysisItem] = Field(description="Exactly one result per email, in any order.")
+
+BATCH_PROMPT = """
+        You are an elite Customer Experience AI. 
+        Analyze EACH of the customer emails below independently.
+        For every email, identify the core Details, the Emotional Tone, and suggest a Next Best Action.
+        Return one result per email and copy its ID into 'email_id'.
+        
+        {emails}
+        """
+
+# Rough sizing used to pick how many emails go into one request
+BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "6000"))
+MAX_BATCH_SIZE = int(os.getenv("ANALYSIS_MAX_BATCH_SIZE", "20"))
+OUTPUT_TOKENS_PER_EMAIL = 120
+PROMPT_OVERHEAD_TOKENS = 120
+
+def analysis_fingerprint():
+    """Hash of everything that shapes an analysis (prompts, schema, model); used to key cached results."""
+    schema = json.dumps(EmailAnalysis.model_json_schema(), sort_keys=True)
+    raw = f"{ANALYSIS_MODEL}\n{ANALYSIS_PROMPT}\n{BATCH_PROMPT}\n{schema}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def failed_analysis():
+    """Placeholder for an email Gemini could not analyze (never cached, so it is retried next scan)."""
+    return EmailAnalysis(
+        sentiment="Neutral", 
+        customer_name="Unknown", 
+        order_id="Error", 
+        category="Error", 
+        summary="Could not analyze this email.",
+        tone="Neutral",                # Default for error
+        recommendation="Check manually" # Default for error
+    )
+
+def analysis_failed(analysis):
+    """True for the placeholder returned when Gemini could not analyze an email."""
+    return analysis.order_id == "Error" and analysis.category == "Error"
+
+def analyze_email(email_text):
+    """
+    Sends email text to Gemini and returns a structured EmailAnalysis object.
+    """
+    try:
+        # We use standard 2.5 Flash (Most reliable for Hackathons)
+        prompt = ANALYSIS_PROMPT.format(email_text=email_text)
+
         # detailed instruction to force the specific JSON structure
-        response = client.models.generate_content(
-            model="gemini-2.5-flash", # Switched to 1.5-flash to ensure stability
+        response = gemini.generate_content(
+            model=ANALYSIS_MODEL,
             contents=prompt,
             config={
                 "response_mime_type": "application/json",
@@ -55,16 +103,69 @@ def analyze_email(email_text):
     except Exception as e:
         print(f"❌ Brain Error: {e}")
         # Return a "dummy" analysis so the app doesn't crash
-        return EmailAnalysis(
-            sentiment="Neutral", 
-            customer_name="Unknown", 
-            order_id="Error", 
-            category="Error", 
-            summary="Could not analyze this email.",
-            tone="Neutral",                # Default for error
-            recommendation="Check manually" # Default for error
+        return failed_analysis()
+
+def plan_batches(email_texts, token_budget=None, max_batch_size=None):
+    """
+    Greedily packs emails into batches that fit the token budget.
+    Returns lists of indexes into 'email_texts'.
+    """
+    token_budget = token_budget or BATCH_TOKEN_BUDGET
+    max_batch_size = max_batch_size or MAX_BATCH_SIZE
+    batches, current, used = [], [], PROMPT_OVERHEAD_TOKENS
+    for i, text in enumerate(email_texts):
+        cost = estimate_tokens(text) + OUTPUT_TOKENS_PER_EMAIL
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], PROMPT_OVERHEAD_TOKENS
+        current.append(i)
+        used += cost
+    if current: batches.append(current)
+    return batches
+
+def analyze_email_batch(email_texts):
+    """
+    Analyzes several emails in ONE structured-output request.
+    Returns a list of EmailAnalysis in the same order as 'email_texts'.
+    Items that come back missing or invalid are re-run individually with analyze_email.
+    If the request itself fails (quota, 5xx or network, after the client's retries), every item gets
+    the failed_analysis() placeholder instead: K single requests would only hit the same limit again.
+    """
+    if len(email_texts) == 1: return [analyze_email(email_texts[0])]
+
+    ids = [f"E{i + 1}" for i in range(len(email_texts))]
+    results = {}
+    try:
+        blocks = "\n".join(f'--- EMAIL ID: {email_id} ---\n"{text}"\n' for email_id, text in zip(ids, email_texts))
+        response = gemini.generate_content(
+            model=ANALYSIS_MODEL,
+            contents=BATCH_PROMPT.format(emails=blocks),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": EmailAnalysisBatch
+            },
+            output_tokens=OUTPUT_TOKENS_PER_EMAIL * len(email_texts)
         )
-    
+    except Exception as e:
+        print(f"❌ Brain Batch Error ({len(ids)} emails left for the next scan): {e}")
+        return [failed_analysis() for _ in ids]
+
+    try:
+        # Validate item by item, so one malformed entry does not sink the whole batch
+        for raw in json.loads(response.text).get("results", []):
+            try:
+                item = EmailAnalysisItem.model_validate(raw)
+            except Exception:
+                continue
+            if item.email_id in ids and item.email_id not in results:
+                results[item.email_id] = EmailAnalysis.model_validate(item.model_dump(exclude={"email_id"}))
+    except Exception as e:
+        print(f"❌ Brain Batch Parse Error: {e}")
+
+    missing = [i for i, email_id in enumerate(ids) if email_id not in results]
+    if missing: print(f"   > Re-running {len(missing)} of {len(ids)} emails individually")
+    return [results[email_id] if email_id in results else analyze_email(email_texts[i]) for i, email_id in enumerate(ids)]
+
 def generate_email_reply(customer_name, issue_summary, sentiment):
     """
     Generates a polite, professional email response.
@@ -84,7 +185,7 @@ def generate_email_reply(customer_name, issue_summary, sentiment):
         - Do not include subject line or placeholders like [Your Name].
         """
         
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model="gemini-1.5-flash",
             contents=prompt
         )
@@ -113,7 +214,7 @@ def translate_to_hindi(text):
         "{text}"
         """
         
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model="gemini-2.5-flash",
             contents=prompt
         )
@@ -122,6 +223,54 @@ def translate_to_hindi(text):
     except Exception:
         return text # Fallback to English
 
+class TranslatedText(BaseModel):
+    text_id: str = Field(description="The ID shown above the source text, copied exactly (e.g. 'T2').")
+    translation: str = Field(description="The Hinglish translation, Latin script only.")
+
+class TranslationBatch(BaseModel):
+    translations: list[TranslatedText] = Field(description="Exactly one translation per source text.")
+
+def translate_batch_to_hindi(texts):
+    """
+    Translates many short summaries into Hinglish in ONE request.
+    Returns a list aligned with 'texts'; entries the model skipped are None.
+    """
+    if not texts: return []
+    ids = [f"T{i + 1}" for i in range(len(texts))]
+    try:
+        blocks = "\n".join(f'[{text_id}] "{text}"' for text_id, text in zip(ids, texts))
+        prompt = f"""
+        You are a strict translation engine for a Voice Assistant. 
+        Translate EACH English text below into natural, conversational Hinglish (Hindi + English mix).
+        
+        RULES:
+        1. Give exactly one final translation per text, tagged with its ID.
+        2. Do NOT provide "Option 1", "Option 2", or any explanations.
+        3. Do NOT use markdown (no bolding, no bullet points).
+        4. Keep it concise and professional.
+        5. Use Latin script (English alphabet) ONLY. Do NOT use Devanagari script.
+
+        TEXTS TO TRANSLATE:
+        {blocks}
+        """
+        response = gemini.generate_content(
+            model="gemini-2.5-flash",
+            contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": TranslationBatch},
+            output_tokens=60 * len(texts)
+        )
+        found = {}
+        for raw in json.loads(response.text).get("translations", []):
+            try:
+                item = TranslatedText.model_validate(raw)
+            except Exception:
+                continue
+            if item.translation.strip(): found.setdefault(item.text_id, item.translation.strip())
+        return [found.get(text_id) for text_id in ids]
+    except Exception as e:
+        print(f"❌ Translation Batch Error: {e}")
+        return [None] * len(texts)
+
 # --- TESTING BLOCK ---
 if __name__ == "__main__":
     test_email = """
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_LOG_DIR = os.getenv("SESSION_LOG_DIR", "session_logs")
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("SESSION_LOG_MEMORY_ENTRIES", "500"))
+DEFAULT_SEGMENT_ENTRIES = int(os.getenv("SESSION_LOG_SEGMENT_ENTRIES", "5000"))
+DEFAULT_MAX_SEGMENTS = int(os.getenv("SESSION_LOG_MAX_SEGMENTS", "50"))  # Oldest segments are deleted past this
+
+INDEX_FILE = "index.json"
+
+
+class LogStore:
+    """
+    Session log with constant memory use.
+    - The newest 'memory_entries' entries live in a ring buffer (what the UI shows first)
+    - Every entry is appended to a JSONL segment on disk; segments rotate every
+      'segment_entries' entries and the oldest are deleted past 'max_segments'
+    - index.json records each segment's sequence range, time range and senders, so
+      query() and page_before() only open the segments that can contain a match
+    Entries are dicts: {"seq", "ts", "sender", "msg", "color"}; 'seq' keeps counting across restarts.
+    """
+
+    def __init__(self, path=None, memory_entries=None, segment_entries=None, max_segments=None):
+        self.path = path or DEFAULT_LOG_DIR
+        self.segment_entries = segment_entries or DEFAULT_SEGMENT_ENTRIES
+        self.max_segments = max_segments or DEFAULT_MAX_SEGMENTS
+        self.recent = deque(maxlen=memory_entries or DEFAULT_MEMORY_ENTRIES)
+        self._lock = threading.Lock()
+        self._file = None
+        self._current = None
+
+        os.makedirs(self.path, exist_ok=True)
+        self.segments = self._load_index()
+        self.next_seq = self.segments[-1]["last_seq"] + 1 if self.segments else 0
+
+    # --- Writing ---
+    def append(self, message, sender, color=None):
+        """Stores one entry (memory + disk) and returns it."""
+        with self._lock:
+            entry = {"seq": self.next_seq, "ts": time.time(), "sender": sender, "msg": message, "color": color}
+            self.next_seq += 1
+            self.recent.append(entry)
+            if self._current is None or self._current["count"] >= self.segment_entries:
+                self._rotate(entry)
+            try:
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._file.flush()  # Readers of the live segment see it straight away
+            except OSError as e:
+                print(f"❌ Log write error: {e}")
+            segment = self._current
+            segment["last_seq"] = entry["seq"]
+            segment["last_ts"] = entry["ts"]
+            segment["count"] += 1
+            segment["senders"][sender] = segment["senders"].get(sender, 0) + 1
+            return entry
+
+    def close(self):
+        with self._lock:
+            if self._file: self._file.close()
+            self._file = None
+            self._current = None
+            self._save_index()
+
+    def _rotate(self, first_entry):
+        if self._file: self._file.close()
+        self._current = {"name": f"segment-{first_entry['seq']:010d}.jsonl", "first_seq": first_entry["seq"], "last_seq": first_entry["seq"],
+                         "first_ts": first_entry["ts"], "last_ts": first_entry["ts"], "count": 0, "senders": {}}
+        self.segments.append(self._current)
+        self._file = open(os.path.join(self.path, self._current["name"]), "a", encoding="utf-8")
+        while len(self.segments) > self.max_segments:
+            old = self.segments.pop(0)
+            try:
+                os.remove(os.path.join(self.path, old["name"]))
+            except OSError:
+                pass
+        self._save_index()
+
+    # --- Reading ---
+    def page_before(self, seq, count=100):
+        """The 'count' entries just older than 'seq', oldest first (for scrolling back)."""
+        with self._lock:
+            in_memory = [entry for entry in self.recent if entry["seq"] < seq]
+            if len(in_memory) >= count or (self.recent and self.recent[0]["seq"] == 0):
+                return in_memory[-count:]
+            segments = [dict(s) for s in self.segments if s["first_seq"] < seq]
+        entries = []
+        for segment in reversed(segments):
+            older = [entry for entry in self._read_segment(segment) if entry["seq"] < seq]
+            entries = older + entries
+            if len(entries) >= count: break
+        return entries[-count:]
+
+    def query(self, start=None, end=None, sender=None, limit=1000):
+        """Entries with start <= ts <= end (epoch seconds) from 'sender' (any if None), oldest first."""
+        with self._lock:
+            segments = [dict(s) for s in self.segments
+                        if (start is None or s["last_ts"] >= start) and (end is None or s["first_ts"] <= end)
+                        and (sender is None or sender in s["senders"])]
+        results = []
+        for segment in segments:
+            for entry in self._read_segment(segment):
+                if start is not None and entry["ts"] < start: continue
+                if end is not None and entry["ts"] > end: break
+                if sender is not None and entry["sender"] != sender: continue
+                results.append(entry)
+                if len(results) >= limit: return results
+        return results
+
+    def _read_segment(self, segment):
+        entries = []
+        try:
+            with open(os.path.join(self.path, segment["name"]), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn last line after a crash
+        except OSError:
+            pass
+        return entries
+
+    # --- Index ---
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.path, INDEX_FILE), encoding="utf-8") as f:
+                segments = json.load(f)["segments"]
+        except (OSError, ValueError, KeyError):
+            segments = []
+        segments = [s for s in segments if os.path.exists(os.path.join(self.path, s["name"]))]
+        # Segment files the index has not seen (or not seen finished, e.g. after a crash) are rescanned
+        known = {s["name"] for s in segments}
+        stale = [s["name"] for s in segments[-1:]] + [name for name in os.listdir(self.path) if name.startswith("segment-") and name not in known]
+        segments = [s for s in segments if s["name"] not in stale]
+        for name in stale:
+            entries = self._read_segment({"name": name})
+            if not entries: continue
+            senders = {}
+            for entry in entries: senders[entry["sender"]] = senders.get(entry["sender"], 0) + 1
+            segments.append({"name": name, "first_seq": entries[0]["seq"], "last_seq": entries[-1]["seq"], "first_ts": entries[0]["ts"],
+                             "last_ts": entries[-1]["ts"], "count": len(entries), "senders": senders})
+        segments.sort(key=lambda s: s["first_seq"])
+        return segments
+
+    def _save_index(self):
+        tmp_path = os.path.join(self.path, f"{INDEX_FILE}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"segments": self.segments}, f)
+            os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
+        except OSError as e:
+            print(f"❌ Log index write error: {e}")
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    import tempfile
+    store = LogStore(path=tempfile.mkdtemp(prefix="logs-"), memory_entries=50, segment_entries=1000)
+    start = time.time()
+    for i in range(10000):
+        store.append(f"message {i}", "User" if i % 3 == 0 else "System")
+    print(f"{len(store.segments)} segments, {len(store.recent)} entries in memory")
+    page = store.page_before(store.recent[0]["seq"], 20)
+    print(f"Page before #{store.recent[0]['seq']}: #{page[0]['seq']}..#{page[-1]['seq']}")
+    print(f"User entries since start: {len(store.query(start=start, sender='User', limit=100000))}")
+    store.close()
+    reopened = LogStore(path=store.path)
+    print(f"Reopened: next seq {reopened.next_seq}, {len(reopened.segments)} segments")
@@ -1,20 +1,72 @@
 import os
+import time
+import threading
 import requests
-import pyaudio
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import re
+from services.audio_cache import AudioCache
+from services.audio_player import AudioPlayer, PA_INT16
+from services.speech_queue import SpeechQueue
+from services.tracing import tracer
 
 load_dotenv()
 
+MODEL = "FALCON"
+# How many utterances may be synthesized ahead of the one currently playing
+DEFAULT_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", "2"))
+
+# Fixed phrases the app says every session; warm_up() pre-synthesizes them
+SYSTEM_PHRASES = [
+    ("System ready.", "en"),
+    ("Sure, scanning your inbox now.", "en"),
+    ("Analysis complete.", "en"),
+    ("All recent feedback is positive.", "en"),
+    ("Draft created successfully.", "en"),
+    ("Failed to create draft.", "en"),
+    ("I couldn't find that email.", "en"),
+    ("Please scan emails first.", "en"),
+    ("I didn't understand.", "en"),
+    ("Which email?", "en"),
+    ("No emails found.", "en"),
+    ("Error occurred.", "en"),
+    ("Goodbye.", "en"),
+    ("Thik hai. Inbox scan kar raha hoon.", "hi"),
+    ("Which email?", "hi"),
+]
+
 class VoiceEngine:
-    def __init__(self):
+    def __init__(self, audio_cache=None, lookahead=None, player=None):
         self.api_key = os.getenv("MURF_API_KEY")
-        self.url = "https://global.api.murf.ai/v1/speech/stream"
+        self.url = os.getenv("MURF_API_URL", "https://global.api.murf.ai/v1/speech/stream")
         
         # Audio Config
         self.sample_rate = 24000
         self.channels = 1
-        self.format = pyaudio.paInt16
+        self.format = PA_INT16
+
+        # Synthesized audio is reused across turns and restarts
+        self.audio_cache = audio_cache or AudioCache()
+
+        # One long-lived output device, fed by its own playback thread
+        self.player = player or AudioPlayer(sample_rate=self.sample_rate, channels=self.channels, sample_format=self.format)
+
+        # Keep-alive connection pool to Murf: no TCP/TLS handshake per utterance
+        # --- HEADER FIX (Removed 'Accept' to fix 406 Error) ---
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({
+            "api-key": self.api_key,
+            "Content-Type": "application/json"
+        })
+
+        # In-flight Murf responses, so interrupt() can abort them mid-stream
+        self._responses = set()
+        self._responses_lock = threading.Lock()
+        self.interrupts = 0
+
+        # Synthesis of the next utterance overlaps playback of the current one
+        self.speech_queue = SpeechQueue(self._synthesize_chunks, self.player, lookahead=lookahead or DEFAULT_LOOKAHEAD)
 
     def _sanitize_text(self, text):
         """Cleans text to prevent TTS static/artifacts."""
@@ -35,42 +87,30 @@ class VoiceEngine:
         
         return text
 
-    def speak(self, text, language_code="en"):
+    def _select_voice(self, language_code):
         """
-        Speaks text using Murf.
         - English: Uses 'Natalie'
         - Hindi: Uses 'Namrita' (hi-IN-namrita)
         """
-        if not text: return
-
-
-        # --- CLEAN THE TEXT BEFORE SENDING ---
-        clean_text = self._sanitize_text(text)
-        print(f"🗣️ Speaking ({language_code}): {clean_text}")
-
-        # --- 1. VOICE SELECTION ---
         if language_code == "hi":
-            selected_voice = "hi-IN-namrita"
             # Namrita is native Hindi, so we usually don't need to force the locale
             # But we leave en-US as base just in case
-            locale = "hi-IN" 
-        else:
-            selected_voice = "en-US-natalie"
-            locale = "en-US"
+            return "hi-IN-namrita", "hi-IN"
+        return "en-US-natalie", "en-US"
 
-        # --- 2. HEADER FIX (Removed 'Accept' to fix 406 Error) ---
-        headers = {
-            "api-key": self.api_key,
-            "Content-Type": "application/json"
-        }
+    def _cache_key(self, clean_text, language_code):
+        selected_voice, locale = self._select_voice(language_code)
+        return self.audio_cache.make_key(clean_text, selected_voice, locale, MODEL, self.sample_rate)
+
+    def _request_stream(self, clean_text, language_code):
+        """Opens a streaming Murf request. Returns the response, or None on API error."""
+        selected_voice, locale = self._select_voice(language_code)
 
-        # --- 3. PAYLOAD ---
         # Note: If Namrita is NOT a Falcon voice, you might need to change model to "GEN2"
         # But for the hackathon, we keep "FALCON" and hope she is supported.
         payload = {
-            # "text": text,
             "text": clean_text,
-            "model": "FALCON",
+            "model": MODEL,
             "voiceId": selected_voice,
             "multiNativeLocale": locale,
             "format": "PCM",
@@ -78,43 +118,121 @@ class VoiceEngine:
             "channelType": "MONO"
         }
 
+        response = self.session.post(self.url, json=payload, stream=True)
+        if response.status_code != 200:
+            print(f"❌ Murf API Error: {response.status_code} - {response.text}")
+            return None
+        return response
+
+    def speak(self, text, language_code="en"):
+        """
+        Speaks text using Murf and blocks until it has been played.
+        Cached phrases play straight from memory/disk; everything else streams from Murf
+        and is stored for next time.
+        """
+        if not text: return
+        self.enqueue(text, language_code=language_code)
+        self.wait_until_idle()
+
+    def enqueue(self, text, language_code="en", pause=0.0):
+        """
+        Queues text for speaking and returns immediately.
+        'pause' seconds of silence are played after it (instead of time.sleep between items).
+        """
+        if not text: return None
+
+        # --- CLEAN THE TEXT BEFORE SENDING ---
+        clean_text = self._sanitize_text(text)
+        print(f"🗣️ Speaking ({language_code}): {clean_text}")
+        return self.speech_queue.enqueue(clean_text, language_code=language_code, pause=pause)
+
+    def wait_until_idle(self, timeout=None):
+        """Blocks until everything queued has finished playing."""
+        return self.speech_queue.wait(timeout)
+
+    def interrupt(self):
+        """
+        Barge-in: stops talking now. Queued speech is dropped, the device is silenced within
+        one player frame, and in-flight Murf streams are closed. Returns without blocking.
+        """
+        self.interrupts += 1
+        self.speech_queue.interrupt()
+        with self._responses_lock:
+            responses = list(self._responses)
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _synthesize_chunks(self, clean_text, language_code, turn_id=None):
+        """Yields PCM chunks for the text, from the audio cache when possible."""
+        started = time.perf_counter()
+        key = self._cache_key(clean_text, language_code)
+        cached_pcm = self.audio_cache.get(key)
+        if cached_pcm is not None:
+            tracer.record("tts_ttfb", (time.perf_counter() - started) * 1000, turn_id=turn_id, cached=True)
+            yield cached_pcm
+            return
+
+        interrupts = self.interrupts
+        response = self._request_stream(clean_text, language_code)
+        if response is None: return
+        with self._responses_lock:
+            self._responses.add(response)
         try:
-            response = requests.post(self.url, headers=headers, json=payload, stream=True)
-            
-            if response.status_code != 200:
-                print(f"❌ Murf API Error: {response.status_code} - {response.text}")
-                return
-
-            # --- 4. STREAM AUDIO ---
-            p = pyaudio.PyAudio()
-            stream = p.open(format=self.format, channels=self.channels, rate=self.sample_rate, output=True)
-
-            audio_buffer = bytearray()
-            MIN_CHUNK_SIZE = 4096 
-
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    audio_buffer.extend(chunk)
-                    
-                    # While we have enough data in the buffer, write it out
-                    while len(audio_buffer) >= MIN_CHUNK_SIZE:
-                        # Take the first 4096 bytes
-                        data_to_play = audio_buffer[:MIN_CHUNK_SIZE]
-                        stream.write(bytes(data_to_play))
-                        
-                        # Remove them from the buffer
-                        del audio_buffer[:MIN_CHUNK_SIZE]
-
-            # Play whatever is left in the buffer at the end
-            if len(audio_buffer) > 0:
-                stream.write(bytes(audio_buffer))
-
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-
-        except Exception as e:
-            print(f"❌ Voice Error: {e}")
+            first = True
+            for chunk in self._stream_response(response, key, interrupts):
+                if first:
+                    tracer.record("tts_ttfb", (time.perf_counter() - started) * 1000, turn_id=turn_id, cached=False)
+                    first = False
+                yield chunk
+        finally:
+            with self._responses_lock:
+                self._responses.discard(response)
+            response.close()
+
+    def _stream_response(self, response, key, interrupts):
+        """Re-chunks a Murf stream for playback and caches the full clip once it is complete."""
+        # --- STREAM AUDIO (and keep a copy for the cache) ---
+        audio_buffer = bytearray()
+        full_audio = bytearray()
+        MIN_CHUNK_SIZE = 4096 
+
+        for chunk in response.iter_content(chunk_size=1024):
+            if chunk:
+                audio_buffer.extend(chunk)
+                full_audio.extend(chunk)
+                
+                # While we have enough data in the buffer, hand it downstream
+                while len(audio_buffer) >= MIN_CHUNK_SIZE:
+                    yield bytes(audio_buffer[:MIN_CHUNK_SIZE])
+                    del audio_buffer[:MIN_CHUNK_SIZE]
+
+        # Whatever is left in the buffer at the end
+        if len(audio_buffer) > 0:
+            yield bytes(audio_buffer)
+
+        # A stream cut short by interrupt() may end quietly; never cache partial audio
+        if self.interrupts == interrupts: self.audio_cache.put(key, bytes(full_audio))
+
+    def close(self):
+        """Releases the audio device and the HTTP connection pool."""
+        self.player.close()
+        self.session.close()
+
+    def warm_up(self, phrases=SYSTEM_PHRASES):
+        """Synthesizes (without playing) any known phrase that is not cached yet."""
+        for text, language_code in phrases:
+            clean_text = self._sanitize_text(text)
+            key = self._cache_key(clean_text, language_code)
+            if key in self.audio_cache: continue
+            try:
+                response = self._request_stream(clean_text, language_code)
+                if response is None: continue
+                self.audio_cache.put(key, b"".join(response.iter_content(chunk_size=4096)))
+            except Exception as e:
+                print(f"❌ Voice warm-up error: {e}")
 
 # --- TEST BLOCK ---
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+import time
+import threading
+from services.tracing import tracer
+from services.llm_brain import analysis_failed
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    """429/5xx and network errors are worth retrying; anything else (4xx, missing SPREADSHEET_ID, bad credentials) is not."""
+    from googleapiclient.errors import HttpError
+    if isinstance(error, HttpError): return error.resp.status in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+class SheetWriter:
+    """
+    Buffers EmailAnalysis rows and appends them to Google Sheets from a background thread.
+    - submit() never blocks on the network
+    - A flush happens when 'batch_size' rows are waiting, 'flush_interval' seconds pass, or flush() is called
+    - Transient failures keep their rows and retry with exponential backoff, up to 'max_attempts' times;
+      permanent failures (and batches out of attempts) are logged and dropped, counted in 'dropped'
+    - Once closing, a batch out of attempts drops the whole buffer so the thread can exit
+    - Placeholder analyses (Gemini gave up) are never written; they are counted in 'skipped'
+    """
+
+    def __init__(self, email_manager, batch_size=50, flush_interval=2.0, max_backoff=30.0, max_attempts=5):
+        self.email_manager = email_manager
+        self.turn_id = tracer.current_turn  # Writes belong to the scan that created the writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self.rows = []
+        self.rows_written = 0
+        self.append_calls = 0
+        self.skipped = 0
+        self.dropped = 0
+        self._first_pending_at = None
+        self._flush_requested = False
+        self._closing = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, analysis):
+        """Queues one analysis for the sheet. Returns False if it was skipped as a failed analysis."""
+        with self._cond:
+            if self._closing: raise RuntimeError("SheetWriter is closed")
+            if analysis_failed(analysis):
+                self.skipped += 1
+                return False
+            self.rows.append(self.email_manager.analysis_to_row(analysis))
+            if self._first_pending_at is None: self._first_pending_at = time.monotonic()
+            if len(self.rows) >= self.batch_size: self._cond.notify()
+            return True
+
+    def flush(self):
+        """Asks the writer to push whatever is buffered right now (does not wait)."""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify()
+
+    def close(self, wait=False, timeout=None):
+        """Flushes the remaining rows and stops the thread once the buffer is empty."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if wait: self._thread.join(timeout)
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self.rows)
+
+    # --- Background loop ---
+    def _run(self):
+        backoff = 1.0
+        attempts = 0
+        while True:
+            with self._cond:
+                while not self._should_flush():
+                    if self._closing and not self.rows: return
+                    self._cond.wait(timeout=self._time_until_due())
+                batch = list(self.rows)
+                self._flush_requested = False
+
+            try:
+                with tracer.span("sheets_write", turn_id=self.turn_id, rows=len(batch)):
+                    self.email_manager.append_rows(batch)
+            except Exception as e:
+                attempts += 1
+                if is_transient(e) and attempts < self.max_attempts:
+                    print(f"Sheet Error (retrying {len(batch)} rows in {backoff:.0f}s): {e}")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                with self._cond:
+                    # Out of attempts while closing: the sheet is unreachable, so give up on the rest too
+                    lost = len(self.rows) if self._closing else len(batch)
+                    del self.rows[:lost]
+                    self.dropped += lost
+                    self._first_pending_at = time.monotonic() if self.rows else None
+                print(f"❌ Sheet Error (dropped {lost} rows after {attempts} attempt(s)): {e}")
+                backoff, attempts = 1.0, 0
+                continue
+
+            backoff, attempts = 1.0, 0
+            with self._cond:
+                # Only drop the rows we actually wrote; new ones may have arrived meanwhile
+                del self.rows[:len(batch)]
+                self.rows_written += len(batch)
+                self.append_calls += 1
+                self._first_pending_at = time.monotonic() if self.rows else None
+
+    def _should_flush(self):
+        if not self.rows: return False
+        if self._closing or self._flush_requested: return True
+        if len(self.rows) >= self.batch_size: return True
+        return time.monotonic() - self._first_pending_at >= self.flush_interval
+
+    def _time_until_due(self):
+        if not self.rows: return None
+        return max(0.0, self.flush_interval - (time.monotonic() - self._first_pending_at))
@@ -0,0 +1,133 @@
+import time
+import queue
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from services.tracing import tracer
+
+_DONE = object()
+
+
+class Utterance:
+    """One queued piece of speech; its PCM chunks arrive on 'chunks' while it is being synthesized."""
+
+    def __init__(self, text, language_code, pause):
+        self.text = text
+        self.language_code = language_code
+        self.pause = pause
+        self.turn_id = tracer.current_turn  # Spans recorded on the pipeline threads belong to the turn that queued it
+        self.playing = False
+        self.played_from = None
+        self.chunks = queue.Queue()
+        self.cancelled = False
+
+
+class SpeechQueue:
+    """
+    Producer/consumer speech pipeline.
+    - A dispatcher starts synthesis for up to 'lookahead' utterances at once
+    - The playback thread feeds them to the AudioPlayer strictly in order
+    So while utterance k plays, utterance k+1 is already being synthesized.
+    Pauses are played as silence frames instead of sleeping.
+    interrupt() cancels everything queued or playing (barge-in).
+    Each utterance records a 'tts_playback' span from its first to its last frame leaving the player.
+    """
+
+    def __init__(self, synthesize, player, lookahead=2):
+        # synthesize(text, language_code, turn_id) -> iterable of PCM byte chunks
+        self.synthesize = synthesize
+        self.player = player
+        self.lookahead = max(1, lookahead)
+
+        self._incoming = queue.Queue()
+        self._ready = queue.Queue()
+        self._slots = threading.Semaphore(self.lookahead)
+        self._pool = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix="tts-synth")
+
+        self._unfinished = 0
+        self._idle = threading.Condition()
+        self._live = set()  # Utterances enqueued but not finished playing
+        self._play_lock = threading.Lock()
+
+        threading.Thread(target=self._dispatch_loop, name="tts-dispatch", daemon=True).start()
+        threading.Thread(target=self._playback_loop, name="tts-playback", daemon=True).start()
+
+    def enqueue(self, text, language_code="en", pause=0.0):
+        """Queues text for speaking and returns immediately."""
+        item = Utterance(text, language_code, pause)
+        with self._idle:
+            self._unfinished += 1
+            self._live.add(item)
+        self._incoming.put(item)
+        return item
+
+    def interrupt(self):
+        """Cancels every queued utterance and silences the player; returns immediately."""
+        with self._play_lock:
+            with self._idle:
+                for item in self._live: item.cancelled = True
+            self.player.flush()
+
+    def wait(self, timeout=None):
+        """Blocks until every queued utterance has finished playing."""
+        with self._idle:
+            if not self._idle.wait_for(lambda: self._unfinished == 0, timeout): return False
+        return self.player.wait(timeout)
+
+    # --- Pipeline threads ---
+    def _dispatch_loop(self):
+        while True:
+            item = self._incoming.get()
+            self._slots.acquire()  # Bounded lookahead
+            self._pool.submit(self._synthesize_into, item)
+            self._ready.put(item)
+
+    def _synthesize_into(self, item):
+        try:
+            if item.cancelled: return
+            chunks = self.synthesize(item.text, item.language_code, item.turn_id)
+            for chunk in chunks:
+                if item.cancelled: break
+                if chunk: item.chunks.put(chunk)
+            if hasattr(chunks, "close"): chunks.close()
+        except Exception as e:
+            if not item.cancelled: print(f"❌ Voice Error: {e}")
+        finally:
+            item.chunks.put(_DONE)
+
+    def _playback_loop(self):
+        while True:
+            item = self._ready.get()
+            try:
+                while True:
+                    chunk = item.chunks.get()
+                    if chunk is _DONE: break
+                    # Cancelled utterances are drained without playing, so the slots still free up in order
+                    with self._play_lock:
+                        if item.cancelled: continue
+                        if not item.playing:
+                            item.playing = True
+                            self.player.call_when_played(partial(self._playback_started, item))
+                        self.player.play(chunk)
+                if item.playing: self.player.call_when_played(partial(self._playback_finished, item))
+                with self._play_lock:
+                    if item.pause > 0 and not item.cancelled: self.player.play(self._silence(item.pause))
+            finally:
+                self._slots.release()
+                with self._idle:
+                    self._live.discard(item)
+                    self._unfinished -= 1
+                    self._idle.notify_all()
+
+    @staticmethod
+    def _playback_started(item):
+        item.played_from = time.perf_counter()
+
+    @staticmethod
+    def _playback_finished(item):
+        tracer.record("tts_playback", (time.perf_counter() - item.played_from) * 1000, turn_id=item.turn_id,
+                      chars=len(item.text), interrupted=item.cancelled)
+
+    def _silence(self, seconds):
+        frame_bytes = 2 * self.player.channels  # 16-bit samples
+        return bytes(int(self.player.sample_rate * seconds) * frame_bytes)
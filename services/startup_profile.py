@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# STARTUP_PROFILE=1 prints where launch time goes: imports, service construction, first paint, greeting
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+LAUNCHED_AT = time.perf_counter()
+
+
+def module_group(name):
+    """Bucket a module under its distribution: 'google.genai.types' -> 'google.genai', 'numpy.linalg' -> 'numpy'."""
+    parts = name.split(".")
+    return ".".join(parts[:2]) if parts[0] in ("google", "services") else parts[0]
+
+
+class _TimedLoader:
+    """Wraps a module loader so exec_module() reports its time to the profiler."""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._exec_module(self._loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer:
+    """sys.meta_path hook: asks the real finders for the spec, then times the loader."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"): continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None: continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self.profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """
+    Collects three kinds of startup costs:
+    - imports: self time per module group (children excluded), via a sys.meta_path hook
+    - steps:   measure("name") blocks, e.g. service construction and background warm-up
+    - marks:   milestones like first paint, as seconds since launch
+    report() prints them; the import hook is only installed with STARTUP_PROFILE=1.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.imports = {}
+        self.steps = []
+        self.marks = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        if self.enabled: return
+        self.enabled = True
+        sys.meta_path.insert(0, _ImportTimer(self))
+
+    def _exec_module(self, loader, module):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack: stack[-1] += elapsed
+            group = module_group(module.__name__)
+            with self._lock:
+                self.imports[group] = self.imports.get(group, 0.0) + elapsed - children
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.steps.append((name, (time.perf_counter() - start) * 1000, threading.current_thread().name))
+
+    def mark(self, name):
+        with self._lock:
+            self.marks.append((name, time.perf_counter() - LAUNCHED_AT))
+
+    def report(self, top=15):
+        if not self.enabled: return
+        with self._lock:
+            imports = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+            steps, marks = list(self.steps), list(self.marks)
+        print("\n=== Startup profile ===")
+        for name, seconds in marks:
+            print(f"{name:<32}{seconds:>8.2f}s after launch")
+        print(f"\n{'step':<32}{'ms':>8}  thread")
+        for name, ms, thread in steps:
+            print(f"{name:<32}{ms:>8.0f}  {thread}")
+        print(f"\n{'import (self time)':<32}{'ms':>8}   total {sum(s for _, s in imports) * 1000:.0f} ms")
+        for group, seconds in imports[:top]:
+            print(f"{group:<32}{seconds * 1000:>8.0f}")
+
+
+profiler = StartupProfiler()
+if STARTUP_PROFILE: profiler.install()
@@ -0,0 +1,127 @@
+import os
+import json
+import threading
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class StreamingBackend:
+    """
+    Interface for realtime speech-to-text backends used by Transcriber in streaming mode.
+    start() -> send_audio() for every mic chunk -> finish() returns the final transcript.
+    """
+
+    def start(self, sample_rate, on_partial=None):
+        raise NotImplementedError
+
+    def send_audio(self, pcm):
+        raise NotImplementedError
+
+    def finish(self, timeout=5.0):
+        raise NotImplementedError
+
+
+class AssemblyAIStreamingBackend(StreamingBackend):
+    """
+    AssemblyAI Universal Streaming (v3) over a websocket.
+    Audio is sent as raw 16-bit PCM while the user talks; 'Turn' messages come back
+    with partial text, and the finished turns are joined into the final transcript.
+    """
+
+    DEFAULT_URL = "wss://streaming.assemblyai.com/v3/ws"
+    MIN_CHUNK_SECONDS = 0.05  # The API rejects audio messages shorter than 50 ms
+
+    def __init__(self, api_key=None, url=None):
+        self.api_key = api_key or os.getenv("ASSEMBLYAI_API_KEY")
+        self.url = url or os.getenv("ASSEMBLYAI_STREAMING_URL", self.DEFAULT_URL)
+        self.ws = None
+        self.on_partial = None
+
+        self._pending = bytearray()
+        self._min_chunk_bytes = 0
+        self._turns = {}
+        self._partial = ""
+        self._closed = False
+        self._send_lock = threading.Lock()
+        self._terminated = threading.Event()
+        self._receiver = None
+
+    def start(self, sample_rate, on_partial=None):
+        from websockets.sync.client import connect  # Only needed in streaming mode
+        self.on_partial = on_partial
+        self._min_chunk_bytes = int(sample_rate * self.MIN_CHUNK_SECONDS) * 2
+        query = urlencode({"sample_rate": sample_rate, "encoding": "pcm_s16le", "format_turns": "true"})
+        self.ws = connect(f"{self.url}?{query}", additional_headers={"Authorization": self.api_key})
+        self._receiver = threading.Thread(target=self._receive_loop, name="stt-receiver", daemon=True)
+        self._receiver.start()
+
+    def send_audio(self, pcm):
+        with self._send_lock:
+            if self._closed: return
+            self._pending.extend(pcm)
+            if len(self._pending) >= self._min_chunk_bytes:
+                self.ws.send(bytes(self._pending))
+                self._pending.clear()
+
+    def finish(self, timeout=5.0):
+        """Flushes buffered audio, asks the server to finalize, and returns the transcript."""
+        with self._send_lock:
+            if not self._closed:
+                self._closed = True
+                try:
+                    if self._pending: self.ws.send(bytes(self._pending))
+                    self._pending.clear()
+                    self.ws.send(json.dumps({"type": "ForceEndpoint"}))
+                    self.ws.send(json.dumps({"type": "Terminate"}))
+                except Exception as e:
+                    print(f"Streaming STT send error: {e}")
+
+        self._terminated.wait(timeout)
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        return self.transcript
+
+    @property
+    def transcript(self):
+        final = " ".join(text for _, text in sorted(self._turns.items()) if text)
+        # If finalization timed out, a trailing partial is better than nothing
+        return f"{final} {self._partial}".strip()
+
+    def _receive_loop(self):
+        try:
+            for message in self.ws:
+                if isinstance(message, bytes): continue
+                data = json.loads(message)
+                kind = data.get("type")
+                if kind == "Turn":
+                    text = data.get("transcript", "")
+                    if data.get("end_of_turn") and data.get("turn_is_formatted"):
+                        self._turns[data.get("turn_order", len(self._turns))] = text
+                        self._partial = ""
+                    else:
+                        self._partial = text
+                    if self.on_partial: self.on_partial(self.transcript)
+                elif kind == "Termination":
+                    break
+                elif kind == "Error" or "error" in data:
+                    print(f"Streaming STT error: {data}")
+                    break
+        except Exception as e:
+            if not self._closed: print(f"Streaming STT connection error: {e}")
+        finally:
+            self._terminated.set()
+
+
+# Registry so the backend can be chosen from .env (STT_STREAMING_BACKEND)
+STREAMING_BACKENDS = {
+    "assemblyai": AssemblyAIStreamingBackend,
+}
+
+
+def create_streaming_backend(name=None):
+    name = name or os.getenv("STT_STREAMING_BACKEND", "assemblyai")
+    return STREAMING_BACKENDS[name]()
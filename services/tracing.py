@@ -0,0 +1,131 @@
+import os
+import json
+import math
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "5000"))
+
+# Stages in the order a voice turn goes through them (used to sort the stats table)
+STAGES = ["turn", "record", "encode", "transcription", "intent", "gmail_fetch", "analysis",
+          "sheets_write", "translation", "draft", "tts_ttfb", "tts_playback"]
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (about 5% resolution from 0.1 ms to over an hour).
+    Memory is fixed no matter how many samples are recorded.
+    """
+
+    GROWTH = 1.05
+    MIN_MS = 0.1
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0 if ms <= self.MIN_MS else int(math.log(ms / self.MIN_MS, self.GROWTH)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100), capped at the true max."""
+        if not self.count: return 0.0
+        rank = max(1, math.ceil(self.count * q / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank: return min(self.MIN_MS * self.GROWTH ** index, self.max_ms)
+        return self.max_ms
+
+
+class Tracer:
+    """
+    Per-stage latency spans for voice turns.
+    - start_turn() issues the turn ID that later spans are tagged with (one turn at a time in this app);
+      work queued for other threads captures current_turn when queued and passes it as turn_id
+    - span(stage) times a block; record(stage, ms) stores a duration measured elsewhere (e.g. TTFB)
+    - stats() gives count/p50/p95/p99/max per stage; export_jsonl() writes the raw spans
+    Recent spans are kept in a bounded deque; histograms cover the whole session.
+    """
+
+    def __init__(self, max_spans=TRACE_MAX_SPANS):
+        self.current_turn = None
+        self.spans = deque(maxlen=max_spans)
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def start_turn(self):
+        self.current_turn = uuid.uuid4().hex[:8]
+        return self.current_turn
+
+    @contextmanager
+    def span(self, stage, turn_id=None, **attrs):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs  # Callers may add attributes (e.g. result sizes) while the span is open
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, turn_id=turn_id, error=error, **attrs)
+
+    def record(self, stage, duration_ms, turn_id=None, error=None, **attrs):
+        entry = {"ts": time.time(), "turn": turn_id or self.current_turn, "stage": stage, "ms": round(duration_ms, 3)}
+        if error: entry["error"] = error
+        if attrs: entry["attrs"] = attrs
+        with self._lock:
+            self.spans.append(entry)
+            self.histograms.setdefault(stage, LatencyHistogram()).add(duration_ms)
+
+    def stats(self):
+        """{stage: {'count', 'p50', 'p95', 'p99', 'max'}} in milliseconds, in pipeline order."""
+        with self._lock:
+            order = sorted(self.histograms, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s))
+            return {stage: {"count": h.count, "p50": h.percentile(50), "p95": h.percentile(95),
+                            "p99": h.percentile(99), "max": h.max_ms}
+                    for stage, h in ((stage, self.histograms[stage]) for stage in order)}
+
+    def turn_spans(self, turn_id):
+        with self._lock:
+            return [entry for entry in self.spans if entry["turn"] == turn_id]
+
+    def export_jsonl(self, path=TRACE_EXPORT_PATH):
+        """Appends the buffered spans to 'path' as JSON lines and returns how many were written."""
+        with self._lock:
+            entries = list(self.spans)
+            self.spans.clear()
+        with open(path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return len(entries)
+
+
+# One tracer for the whole process, like the shared Gemini client
+tracer = Tracer()
+
+
+# --- TESTING BLOCK ---
+if __name__ == "__main__":
+    import random
+
+    tracer.start_turn()
+    for _ in range(200):
+        with tracer.span("intent", source="local"):
+            time.sleep(random.uniform(0.0005, 0.003))
+    tracer.record("tts_ttfb", 180.0)
+    for stage, s in tracer.stats().items():
+        print(f"{stage:<12} n={s['count']:<4} p50={s['p50']:.1f}ms p95={s['p95']:.1f}ms p99={s['p99']:.1f}ms")
@@ -1,33 +1,66 @@
 import os
-import wave
-import pyaudio
-import assemblyai as aai
-import threading
 import time
+import numpy as np
+import threading
 from dotenv import load_dotenv
+from services.streaming_stt import create_streaming_backend
+from services.vad import EnergyVAD
+from services.audio_capture import RingBuffer, resample, encode_audio
+from services.tracing import tracer
+from services.audio_player import PA_INT16
 
 load_dotenv()
 
 class Transcriber:
-    def __init__(self):
+    def __init__(self, streaming=None, backend_factory=create_streaming_backend):
         self.api_key = os.getenv("ASSEMBLYAI_API_KEY")
-        aai.settings.api_key = self.api_key
         
         self.CHUNK = 1024
-        self.FORMAT = pyaudio.paInt16
+        self.FORMAT = PA_INT16
         self.CHANNELS = 1
         self.RATE = 44100
-        self.OUTPUT_FILENAME = "command.wav"
+        self.TARGET_RATE = 16000  # All speech recognition needs
+        self.UPLOAD_CODEC = os.getenv("STT_UPLOAD_CODEC", "flac")  # 'flac' (needs soundfile) or 'wav'
+        self.MAX_SECONDS = int(os.getenv("CAPTURE_MAX_SECONDS", "30"))
         
-        self.frames = []
+        # Fixed-size capture memory; no per-session files on disk
+        self.buffer = RingBuffer(self.RATE * self.MAX_SECONDS)
         self.is_recording = False
         self.stream = None
         self.p = None
 
+        # --- STREAMING MODE ---
+        # Audio goes to a realtime websocket while the user talks (STT_MODE=streaming in .env)
+        self.streaming = streaming if streaming is not None else os.getenv("STT_MODE", "batch") == "streaming"
+        self.backend_factory = backend_factory
+        self.backend = None
+        self.on_partial = None  # Optional callback(text) for live captions
+
+        # --- VAD ENDPOINTING ---
+        # The turn ends by itself after enough trailing silence (VAD_AUTO_STOP=0 to disable)
+        self.vad = EnergyVAD(self.RATE)
+        self.auto_stop = os.getenv("VAD_AUTO_STOP", "1") == "1"
+        self.on_auto_stop = None  # Optional callback() fired from the recording thread
+        self.turn_ended = threading.Event()
+        self._record_thread = None
+        self._started_at = None
+
+        # --- BARGE-IN ---
+        # Optional mic monitor while the agent talks (BARGE_IN_VAD=1). Without echo cancellation
+        # the speakers can trigger it, so it needs a louder level than normal endpointing.
+        self.barge_in = os.getenv("BARGE_IN_VAD", "0") == "1"
+        self.barge_in_vad = EnergyVAD(self.RATE, threshold_db=float(os.getenv("BARGE_IN_THRESHOLD_DB", "-30")), min_speech_ms=200)
+        self._monitoring = False
+        self._monitor_thread = None
+
     def start_recording(self):
         """Starts recording audio in a background thread."""
-        self.frames = []
+        self.buffer.clear()
         self.is_recording = True
+        self.vad.reset()
+        self.turn_ended.clear()
+        self._started_at = time.perf_counter()
+        import pyaudio  # Only needed once the mic is actually opened
         self.p = pyaudio.PyAudio()
         
         # Open stream
@@ -37,8 +70,17 @@ class Transcriber:
                         input=True,
                         frames_per_buffer=self.CHUNK)
         
+        if self.streaming:
+            try:
+                self.backend = self.backend_factory()
+                self.backend.start(self.RATE, on_partial=self.on_partial)
+            except Exception as e:
+                print(f"Streaming STT unavailable, using batch upload: {e}")
+                self.backend = None
+
         # Start the listener thread
-        threading.Thread(target=self._record_loop, daemon=True).start()
+        self._record_thread = threading.Thread(target=self._record_loop, daemon=True)
+        self._record_thread.start()
         print("🔴 Recording started...")
 
     def _record_loop(self):
@@ -47,20 +89,32 @@ class Transcriber:
             try:
                 # 'exception_on_overflow' prevents crashes if CPU is busy
                 data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                self.frames.append(data)
+                self.buffer.write(np.frombuffer(data, dtype=np.int16))
+                backend = self.backend
+                if backend: backend.send_audio(data)
             except Exception:
                 # If stream is closed externally, just exit the loop safely
                 break
 
+            self.vad.process(data)
+            if self.auto_stop and self.vad.end_of_turn:
+                print("🤫 Silence detected, ending turn.")
+                self.turn_ended.set()
+                if self.on_auto_stop: self.on_auto_stop()
+                break
+
     def stop_recording(self):
-        """Stops recording, saves file, and returns the transcript."""
+        """Stops recording and returns the transcript (audio never touches the disk)."""
         print("⏹️ Stopping recording...")
         
         # 1. Signal loop to stop
         self.is_recording = False
         
-        # 2. Safety Buffer: Wait 0.2s for the thread to finish its last read
-        time.sleep(0.2) 
+        # 2. Wait for the thread to finish its last read (at most one CHUNK)
+        if self._record_thread and self._record_thread is not threading.current_thread():
+            self._record_thread.join(timeout=1.0)
+        if self._started_at: tracer.record("record", (time.perf_counter() - self._started_at) * 1000)
+        self._started_at = None
         
         # 3. Cleanup Audio Resources safely
         try:
@@ -72,30 +126,99 @@ class Transcriber:
         except Exception as e:
             print(f"Warning during audio cleanup: {e}")
 
-        # 4. Save File
+        # 4a. Streaming: the server already heard everything, just wait for the final text
+        if self.backend:
+            backend, self.backend = self.backend, None
+            try:
+                with tracer.span("transcription", mode="streaming"):
+                    return backend.finish()
+            except Exception as e:
+                print(f"Streaming STT failed, falling back to upload: {e}")
+
+        if self.buffer.overflowed:
+            print(f"Warning: recording exceeded {self.MAX_SECONDS}s, only the latest audio was kept")
+
+        # 4. Trim leading/trailing silence so we only upload speech
+        audio = self.vad.trim(self.buffer.read())
+        if len(audio) == 0:
+            print("... No speech detected ...")
+            return ""
+
+        # 5. Downsample to 16 kHz and encode in memory
         try:
-            wf = wave.open(self.OUTPUT_FILENAME, 'wb')
-            wf.setnchannels(self.CHANNELS)
-            wf.setsampwidth(self.p.get_sample_size(self.FORMAT))
-            wf.setframerate(self.RATE)
-            wf.writeframes(b''.join(self.frames))
-            wf.close()
+            with tracer.span("encode") as span:
+                audio = resample(audio, self.RATE, self.TARGET_RATE)
+                payload, codec = encode_audio(audio, self.TARGET_RATE, codec=self.UPLOAD_CODEC)
+                span["codec"] = codec
         except Exception as e:
-            print(f"Error saving audio file: {e}")
+            print(f"Error encoding audio: {e}")
             return ""
 
-        # 5. Transcribe
-        print("📝 Transcribing...")
-        return self._transcribe_file()
+        # 6. Transcribe
+        print(f"📝 Transcribing ({codec}, {len(payload.getbuffer()) // 1024} KB)...")
+        with tracer.span("transcription", mode="upload", bytes=len(payload.getbuffer())):
+            return self._transcribe_audio(payload)
+
+    def start_barge_in_monitor(self, on_speech):
+        """Watches the mic (VAD only, no audio is kept) and calls on_speech() once the user starts talking."""
+        if not self.barge_in or self._monitoring: return
+        self._monitoring = True
+        self.barge_in_vad.reset()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, args=(on_speech,), name="barge-in", daemon=True)
+        self._monitor_thread.start()
+
+    def stop_barge_in_monitor(self):
+        self._monitoring = False
+        if self._monitor_thread and self._monitor_thread is not threading.current_thread():
+            self._monitor_thread.join(timeout=1.0)
+        self._monitor_thread = None
+
+    def _monitor_loop(self, on_speech):
+        p = None
+        stream = None
+        try:
+            import pyaudio
+            p = pyaudio.PyAudio()
+            stream = p.open(format=self.FORMAT, channels=self.CHANNELS, rate=self.RATE, input=True, frames_per_buffer=self.CHUNK)
+            while self._monitoring:
+                self.barge_in_vad.process(stream.read(self.CHUNK, exception_on_overflow=False))
+                if self.barge_in_vad.speech_started:
+                    print("✋ Barge-in detected.")
+                    self._monitoring = False
+                    on_speech()
+                    break
+        except Exception as e:
+            print(f"Barge-in monitor error: {e}")
+        finally:
+            try:
+                if stream:
+                    stream.stop_stream()
+                    stream.close()
+                if p: p.terminate()
+            except Exception as e:
+                print(f"Warning during audio cleanup: {e}")
+
+    def listen(self, timeout=None):
+        """Records one turn, ending it on trailing silence (or after 'timeout' seconds), and transcribes it."""
+        self.start_recording()
+        self.turn_ended.wait(timeout)
+        return self.stop_recording()
+
+    def warm_up(self):
+        """Imports the AssemblyAI SDK (about half a second) ahead of the first transcription."""
+        import assemblyai as aai
+        aai.settings.api_key = self.api_key
+        return aai
 
-    def _transcribe_file(self):
+    def _transcribe_audio(self, payload):
         try:
+            aai = self.warm_up()
             transcriber = aai.Transcriber()
-            transcript = transcriber.transcribe(self.OUTPUT_FILENAME)
+            transcript = transcriber.transcribe(payload)
             
             if transcript.status == aai.TranscriptStatus.error:
                 return f"Error: {transcript.error}"
             
             return transcript.text or ""
         except Exception as e:
-            return f"Error: {e}"
\ No newline at end of file
+            return f"Error: {e}"
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from services.llm_brain import translate_to_hindi, translate_batch_to_hindi
+from services.tracing import tracer
+
+MAX_TEXTS_PER_REQUEST = 20  # Bigger batches risk truncated structured output, which loses the whole batch
+
+
+class TranslationCache:
+    """
+    Memoizing Hinglish translation layer, keyed by a hash of the English source text.
+    - translate_many(): misses are batched, up to MAX_TEXTS_PER_REQUEST texts per Gemini request
+    - prefetch(): same, on a background thread, so translations are ready before playback
+    Texts already being translated by another thread are waited on, not requested twice.
+    """
+
+    def __init__(self, translate_fn=translate_to_hindi, translate_batch_fn=translate_batch_to_hindi):
+        self.translate_fn = translate_fn
+        self.translate_batch_fn = translate_batch_fn
+        self.requests_made = 0
+
+        self._memo = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        """Cached translation, or None (never calls Gemini)."""
+        with self._lock:
+            return self._memo.get(self._key(text))
+
+    def translate(self, text):
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts, turn_id=None):
+        """Returns translations aligned with 'texts'; misses cost one Gemini request per MAX_TEXTS_PER_REQUEST texts."""
+        keys = [self._key(text) for text in texts]
+        to_fetch, to_wait = {}, {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._memo or key in to_fetch: continue
+                if key in self._inflight:
+                    to_wait[key] = self._inflight[key]
+                else:
+                    to_fetch[key] = text
+                    self._inflight[key] = threading.Event()
+
+        pending = list(to_fetch.items())
+        for start in range(0, len(pending), MAX_TEXTS_PER_REQUEST):
+            self._fetch(dict(pending[start:start + MAX_TEXTS_PER_REQUEST]), turn_id)
+        for event in to_wait.values(): event.wait()
+
+        with self._lock:
+            # Anything Gemini could not translate falls back to the English text (and is not memoized)
+            return [self._memo.get(key, text) for key, text in zip(keys, texts)]
+
+    def prefetch(self, texts):
+        """Starts translating 'texts' in the background and returns immediately."""
+        pending = [text for text in dict.fromkeys(texts) if self.get(text) is None]
+        if not pending: return None
+        thread = threading.Thread(target=self.translate_many, args=(pending, tracer.current_turn), name="translation-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+    def _fetch(self, to_fetch, turn_id=None):
+        keys, texts = list(to_fetch.keys()), list(to_fetch.values())
+        try:
+            self.requests_made += 1
+            with tracer.span("translation", turn_id=turn_id, texts=len(texts)):
+                if len(texts) == 1:
+                    translated = self.translate_fn(texts[0])
+                    results = [translated if translated != texts[0] else None]
+                else:
+                    results = self.translate_batch_fn(texts)
+        except Exception as e:
+            print(f"❌ Translation Error: {e}")
+            results = [None] * len(texts)
+
+        with self._lock:
+            for key, result in zip(keys, results):
+                if result: self._memo[key] = result
+                event = self._inflight.pop(key, None)
+                if event: event.set()
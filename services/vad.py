@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-42"))
+DEFAULT_TRAILING_SILENCE_MS = int(os.getenv("VAD_TRAILING_SILENCE_MS", "900"))
+DEFAULT_NO_SPEECH_TIMEOUT_MS = int(os.getenv("VAD_NO_SPEECH_TIMEOUT_MS", "8000"))
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector for 16-bit mono PCM.
+    - process(chunk): feed mic chunks as they arrive; 'end_of_turn' flips once speech was
+      heard and then 'trailing_silence_ms' of silence followed (or nobody spoke at all)
+    - trim(pcm): cuts leading/trailing silence from a finished recording
+    Everything is vectorized over the int16 samples, so a chunk costs a few NumPy calls.
+    """
+
+    NOISE_MARGIN_DB = 10.0  # Speech must be this much louder than the measured room noise
+
+    def __init__(self, sample_rate, frame_ms=30, threshold_db=None, trailing_silence_ms=None,
+                 min_speech_ms=120, padding_ms=200, no_speech_timeout_ms=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_ms = frame_ms
+        self.threshold_db = DEFAULT_THRESHOLD_DB if threshold_db is None else threshold_db
+        self.trailing_silence_ms = DEFAULT_TRAILING_SILENCE_MS if trailing_silence_ms is None else trailing_silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.padding_ms = padding_ms
+        self.no_speech_timeout_ms = DEFAULT_NO_SPEECH_TIMEOUT_MS if no_speech_timeout_ms is None else no_speech_timeout_ms
+        self.reset()
+
+    def reset(self):
+        self.noise_floor_db = None
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.elapsed_ms = 0
+        self.speech_started = False
+        self._carry = np.zeros(0, dtype=np.int16)
+
+    # --- Levels ---
+    def frame_levels(self, samples):
+        """dBFS level of each complete frame in an int16 array."""
+        count = len(samples) // self.frame_samples
+        if count == 0: return np.zeros(0)
+        frames = samples[:count * self.frame_samples].reshape(count, self.frame_samples).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+        return 20.0 * np.log10(np.maximum(rms, 1e-6))
+
+    def _is_speech(self, levels):
+        threshold = self.threshold_db
+        if self.noise_floor_db is not None:
+            threshold = max(threshold, self.noise_floor_db + self.NOISE_MARGIN_DB)
+        return levels > threshold
+
+    # --- Streaming ---
+    def process(self, chunk):
+        """Feeds one mic chunk (bytes). Returns True if it contained speech."""
+        samples = np.concatenate([self._carry, np.frombuffer(chunk, dtype=np.int16)])
+        levels = self.frame_levels(samples)
+        self._carry = samples[len(levels) * self.frame_samples:]
+        if len(levels) == 0: return False
+
+        speech = self._is_speech(levels)
+        quiet = levels[~speech]
+        if len(quiet):
+            # Slow-moving estimate of the room noise, from non-speech frames only
+            level = float(np.median(quiet))
+            self.noise_floor_db = level if self.noise_floor_db is None else 0.9 * self.noise_floor_db + 0.1 * level
+
+        self.elapsed_ms += len(levels) * self.frame_ms
+        for is_speech in speech:
+            if is_speech:
+                self.speech_ms += self.frame_ms
+                self.silence_ms = 0
+                if self.speech_ms >= self.min_speech_ms: self.speech_started = True
+            else:
+                self.silence_ms += self.frame_ms
+        return bool(speech.any())
+
+    @property
+    def end_of_turn(self):
+        if self.speech_started: return self.silence_ms >= self.trailing_silence_ms
+        return self.elapsed_ms >= self.no_speech_timeout_ms
+
+    # --- Offline ---
+    def trim(self, pcm):
+        """Returns 'pcm' (bytes or int16 array, same type back) without its leading/trailing silence."""
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+        trimmed = self._trim_samples(samples)
+        return trimmed if isinstance(pcm, np.ndarray) else trimmed.tobytes()
+
+    def _trim_samples(self, samples):
+        levels = self.frame_levels(samples)
+        voiced = np.flatnonzero(self._is_speech(levels))
+        if len(voiced) == 0: return samples[:0]
+
+        # Keep 'padding_ms' around the speech so word edges are not clipped
+        pad = int(self.padding_ms / self.frame_ms)
+        start = max(0, voiced[0] - pad) * self.frame_samples
+        end = min(len(levels), voiced[-1] + 1 + pad) * self.frame_samples
+        if voiced[-1] + 1 + pad >= len(levels): end = len(samples)  # Keep the partial tail frame
+        return samples[start:end]